@@ -0,0 +1,214 @@
+#----------------------------------------------------------------------------#
+# JSON API (/api/v1) over the same query layer as the HTML views.
+#----------------------------------------------------------------------------#
+
+import json
+
+from flask import Blueprint, Response, abort, current_app, request
+
+import deletes
+import queries
+import scheduling
+import search
+from cache import detail_cache
+from models import db
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def dumps(data):
+    #orjson when installed (serializes datetimes natively), compact stdlib json otherwise
+    if orjson is not None:
+        return orjson.dumps(data, default=str)
+    return json.dumps(data, separators=(',', ':'), default=str)
+
+
+def json_response(data, status=200):
+    return Response(dumps(data), status=status, mimetype='application/json')
+
+
+def requested_fields():
+    #?fields=id,name keeps only those keys of each returned object
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+
+def sparse(item, fields):
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def json_field(name):
+    #a field of the request's JSON object, None for any other body (an array,
+    #a string, invalid JSON)
+    body = request.get_json(silent=True)
+    return body.get(name) if isinstance(body, dict) else None
+
+
+def page_response(page):
+    fields = requested_fields()
+    return json_response({
+        "data": [sparse(item, fields) for item in page.items],
+        "next": page.next_cursor,
+        "prev": page.prev_cursor
+    })
+
+
+def detail_response(kind, id, stamps, build):
+    #cached per version of the entity like the HTML pages (see cache.DetailCache),
+    #so an edit made on another worker is never answered from this one's entry
+    validator = stamps(id)
+    if validator is None:
+        abort(404)
+    data = detail_cache.get_or_build(kind, id, build, version=validator[0])
+    if data is None:
+        abort(404)
+    return json_response(sparse(data, requested_fields()))
+
+
+#------------------------------VENUES------------------------------
+@api.route('/venues')
+def venues():
+    return page_response(queries.venues_page(genre=request.args.get('genre'), **queries.page_args(request.args)))
+
+
+@api.route('/venues/availability')
+def venue_availability():
+    # ?city=&state=&from=2021-09-01&to=2021-09-08&min_slot=120: the free
+    # slots of each venue of the city in the window
+    try:
+        args = scheduling.availability_args(request.args)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+    return json_response({"data": scheduling.availability(**args)})
+
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    return detail_response('venue', venue_id, queries.venue_stamps, queries.venue_detail)
+
+
+#------------------------------ARTISTS------------------------------
+@api.route('/artists')
+def artists():
+    return page_response(queries.artists_page(genre=request.args.get('genre'), **queries.page_args(request.args)))
+
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    return detail_response('artist', artist_id, queries.artist_stamps, queries.artist_detail)
+
+
+#------------------------------SHOWS------------------------------
+@api.route('/shows')
+def shows():
+    return page_response(queries.shows_page(**queries.page_args(request.args)))
+
+
+@api.route('/shows', methods=['POST'])
+def schedule_shows():
+    # {"shows": [{"artist_id": 1, "venue_id": 2, "start_time": "2021-09-01T20:00",
+    # "duration": 90}, ...]}: every show that double-books neither its venue nor
+    # its artist is created, in one transaction, and all conflicts are reported
+    items = json_field('shows')
+    if not isinstance(items, list) or not items:
+        return json_response({"error": "expected {\"shows\": [show, ...]}"}, 400)
+    if len(items) > current_app.config['MAX_BATCH_SHOWS']:
+        return json_response({"error": "at most {} shows per request".format(current_app.config['MAX_BATCH_SHOWS'])}, 400)
+
+    entries, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            entries.append(scheduling.parse_entry(item))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    if errors:
+        return json_response({"error": "invalid shows", "errors": errors}, 400)
+
+    try:
+        created, conflicts = scheduling.schedule(entries)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    scheduling.forget(created)
+    return json_response({"created": created, "conflicts": conflicts}, 201 if created else 409)
+
+
+#------------------------------GENRES------------------------------
+@api.route('/genres')
+def genres():
+    #facet counts for the ?genre= filter of the venue and artist listings
+    return json_response({"data": queries.genre_facets()})
+
+
+#------------------------------SEARCH------------------------------
+@api.route('/search/<any(venues, artists):kind>')
+def search_entities(kind):
+    term = request.args.get('q', '')
+    limit = current_app.config['SEARCH_LIMIT']
+    results = search.search_venues(term, limit) if kind == 'venues' else search.search_artists(term, limit)
+    fields = requested_fields()
+    return json_response({
+        "count": results['count'],
+        "data": [sparse(item, fields) for item in results['data']]
+    })
+
+
+#------------------------------MATCHES------------------------------
+@api.route('/<any(venues, artists):kind>/matches')
+def matches(kind):
+    # ?ids=1,2,3&limit=10: the best matching artists for each of the venues
+    # (or venues for each artist), scored together from the in-memory index.
+    # matching.py (NumPy) is imported here, like forms.py by the form views,
+    # so importing the app does not load it
+    from matching import match_index
+    try:
+        ids = [int(id) for id in request.args.get('ids', '').split(',')]
+    except ValueError:
+        return json_response({"error": "ids must be a comma separated list of integers"}, 400)
+    if len(ids) > current_app.config['MAX_PAGE_SIZE']:
+        return json_response({"error": "at most {} ids per request".format(current_app.config['MAX_PAGE_SIZE'])}, 400)
+    limit = request.args.get('limit', current_app.config['MATCH_LIMIT'], type=int)
+    limit = max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+    results = match_index.matches(kind[:-1], ids, limit)
+    fields = requested_fields()
+    return json_response({"data": [
+        {"id": id, "matches": [sparse(match, fields) for match in result]}
+        for id, result in zip(ids, results)
+    ]})
+
+
+#------------------------------BATCH DELETE------------------------------
+@api.route('/<any(venues, artists):kind>', methods=['DELETE'])
+def delete_entities(kind):
+    # {"ids": [1, 2, 3]}: the listed venues (or artists) and their shows are
+    # deleted in one transaction, ids that do not exist are reported back
+    ids = json_field('ids')
+    if not isinstance(ids, list) or not ids or not all(type(id) is int for id in ids):
+        return json_response({"error": "expected {\"ids\": [integer, ...]}"}, 400)
+    if len(ids) > current_app.config['MAX_BATCH_DELETE']:
+        return json_response({"error": "at most {} ids per request".format(current_app.config['MAX_BATCH_DELETE'])}, 400)
+
+    kind = kind[:-1]
+    try:
+        deleted, others = deletes.delete_entities(kind, ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    deletes.forget(kind, deleted, others)
+    return json_response({"deleted": deleted, "missing": sorted(set(ids) - set(deleted))})
+
+
+@api.errorhandler(404)
+def not_found_error(error):
+    return json_response({"error": "not found"}, 404)
@@ -0,0 +1,174 @@
+#----------------------------------------------------------------------------#
+# Artist pages: listing, search, detail and the create/edit/delete views.
+#----------------------------------------------------------------------------#
+# forms.py (WTForms) is imported inside the form views, so a worker or a
+# CLI command that never handles a form does not load it.
+
+from flask import Blueprint, abort, current_app, flash, g, redirect, render_template, request, url_for
+
+import deletes
+import matching
+import queries
+import search
+import templating
+from autocomplete import artist_index
+from cache import detail_cache
+from conditional import conditional
+from instrumentation import query_budget
+from matching import match_index
+from models import db, Artist
+
+bp = Blueprint('artists', __name__)
+
+
+#-------------DISPLAY ARTISTS LIST-------------------
+@bp.route('/artists')
+@query_budget(4)
+@conditional(queries.artists_stamps)
+def artists():
+  #?genre= keeps the artists playing that genre
+  #the page is streamed, its rows are read from a server-side cursor as it renders
+  page = queries.artists_stream(genre=request.args.get('genre'), **queries.page_args(request.args))
+  return templating.stream_template('pages/artists.html', artists=page.items, page=page)
+
+#-----------SEARCH FOR ARTISTS-------------
+@bp.route('/artists/search', methods=['POST'])
+@query_budget(2)
+def search_artists():
+  search_term=request.form.get('search_term','')
+  response = search.search_artists(search_term, current_app.config['SEARCH_LIMIT'])
+  return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
+
+#-----------------DISPLAYING AN ARTIST'S PAGE-----------
+def artist_page_stamps(artist_id):
+  #the recommended venues are part of the page too; the cached payload is
+  #versioned on the artist's own stamps, which the API's is keyed on as well
+  stamps = queries.artist_stamps(artist_id)
+  if stamps is not None:
+    g.detail_version = stamps[0]
+  return matching.stamped(stamps, matching.page_matches('artist', artist_id))
+
+@bp.route('/artists/<int:artist_id>')
+@query_budget(4)
+@conditional(artist_page_stamps)
+def show_artist(artist_id):
+  #artist data with its past and upcoming shows, served from the detail cache
+  #cached per version of the page, see cache.DetailCache
+  data = detail_cache.get_or_build('artist', artist_id, queries.artist_detail, version=g.get('detail_version'))
+  if data is None:
+    abort(404)
+  #recommended venues come from the in-memory match index, not the database
+  matches = matching.page_matches('artist', artist_id)
+  return render_template('pages/show_artist.html', artist=data, matches=matches)
+
+#--------------------------DELETING AN ARTIST------------------
+@bp.route('/artists/<int:artist_id>', methods=['DELETE'])
+def delete_artist(artist_id):
+  artist = Artist.query.get(artist_id)
+  if artist is None:
+    abort(404)
+  artist_name = artist.name
+  try:
+    #one DELETE statement, the database removes the artist's shows (see deletes.py)
+    deleted, venue_ids = deletes.delete_entities('artist', [artist_id])
+    db.session.commit()
+    deletes.forget('artist', deleted, venue_ids)
+    flash('Artist ' + artist_name + ' was deleted')
+  except:
+    flash('An error occured and Artist ' + artist_name + ' was not deleted')
+    db.session.rollback()
+  finally:
+    db.session.close()
+
+  return redirect(url_for('main.index'))
+
+#--------------------------EDITING & UPDATING ARTIST------------------------
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  from forms import ArtistForm
+  form = ArtistForm()
+  artist = Artist.query.get(artist_id)
+
+  artist_inf={
+    "id": artist.id,
+    "name": artist.name,
+    "genres": artist.genres,
+    "city": artist.city,
+    "state": artist.state,
+    "phone": artist.phone,
+    "facebook_link": artist.facebook_link,
+    "seeking_venue": artist.seeking_venue,
+    "seeking_description": artist.seeking_description,
+    "image_link": artist.image_link
+  }
+  return render_template('forms/edit_artist.html', form=form, artist=artist_inf)
+
+#--------------------------------EDIT ARTIST SUBMISSION FORM---------------------
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  from forms import ArtistForm
+  try:
+    form = ArtistForm(request.form)
+    artist = Artist.query.get(artist_id)
+
+    artist.name = form.name.data
+    artist.phone = form.phone.data
+    artist.state = form.state.data
+    artist.city = form.city.data
+    artist.genres = form.genres.data
+    artist.image_link = form.image_link.data
+    artist.facebook_link = form.facebook_link.data
+    artist.seeking_venue = form.seeking_venue.data
+    artist.seeking_description = form.seeking_description.data
+    
+    db.session.commit()
+    artist_index.add(artist_id, artist.name)
+    match_index.update('artist', artist)
+    #the artist's name and image also appear on the pages of its venues
+    detail_cache.invalidate('artist', artist_id)
+    detail_cache.invalidate('venue', *queries.artist_venue_ids(artist_id))
+    flash('The Artist ' + request.form['name'] + ' has been successfully updated!')
+  except:
+    db.session.rollback()
+    flash('An Error has occured, Update is not applied')
+  finally:
+    db.session.close()
+  return redirect(url_for('.show_artist', artist_id=artist_id))
+
+
+#---------------CREATE AN ARTIST------------------------
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  from forms import ArtistForm
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  from forms import ArtistForm
+  form = ArtistForm(request.form)
+  try:
+    artist = Artist(
+      name=form.name.data,
+      city=form.city.data,
+      state=form.state.data,
+      phone=form.phone.data,
+      image_link=form.image_link.data,
+      facebook_link=form.facebook_link.data,
+      seeking_venue=form.seeking_venue.data,
+      seeking_description=form.seeking_description.data,
+      genres=form.genres.data
+    )
+    db.session.add(artist)
+    db.session.commit()
+    artist_index.add(artist.id, artist.name)
+    match_index.update('artist', artist)
+    #On succesive db insert, show message that artist was succesfully listed
+    flash('Artist ' + request.form['name'] + ' was successfully listed!')
+  except:
+    db.session.rollback()
+    #In case of failure, show message that an error occured
+    flash('An error occurred. Artist '+ request.form['name'] + ' could not be listed')
+  finally:
+    db.session.close()
+  return render_template('pages/home.html')
@@ -0,0 +1,338 @@
+#----------------------------------------------------------------------------#
+# ASGI entry point (optional).
+#
+#   uvicorn asgi:app --workers 4
+#
+# The read-only pages (venue, artist and show listings, venue and artist
+# pages) are answered by async handlers on an asyncpg engine, so a worker
+# keeps serving other requests while Postgres works.  They run the query
+# layer's statements and render the same templates inside a Flask request
+# context.  Everything else (forms, writes, the JSON API, static files,
+# pages with pending flashed messages) is passed to the Flask app in a
+# worker thread.
+#----------------------------------------------------------------------------#
+
+import asyncio
+import io
+import sys
+
+from flask import make_response, render_template, request, session
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import conditional
+import matching
+import queries
+from app import create_app
+from cache import SharedCache
+from models import Venue, Artist
+
+flask_app = create_app()
+detail_cache = flask_app.extensions['detail_cache']
+#a shared backend is a network round trip, made in a worker thread
+blocking_cache = isinstance(detail_cache.backend, SharedCache)
+#read in memory, loaded through the sync engine when the server starts
+match_index = flask_app.extensions['matching']
+
+
+def async_url(config):
+    #ASYNC_DATABASE_URI, or the application database through asyncpg
+    return config.get('ASYNC_DATABASE_URI') or make_url(config['SQLALCHEMY_DATABASE_URI']).set(drivername='postgresql+asyncpg')
+
+
+engine = create_async_engine(async_url(flask_app.config), pool_size=flask_app.config.get('ASYNC_POOL_SIZE', 10))
+Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+#----------------------------------------------------------------------------#
+# Async views, keyed by the endpoint of the Flask view they stand in for.
+#----------------------------------------------------------------------------#
+
+HANDLERS = {}
+
+
+def handles(endpoint):
+    def decorator(handler):
+        HANDLERS[endpoint] = handler
+        return handler
+    return decorator
+
+
+async def conditional_page(validator, build):
+    #the async counterpart of @conditional: 304 before any page query runs
+    etag, last_modified, modified = conditional.validate(validator)
+    response = make_response(await build()) if modified else flask_app.response_class(status=304)
+    return conditional.finish(response, etag, last_modified)
+
+
+async def listing_validator(db_session, listing):
+    stamps = await db_session.execute(queries.listing_stamps_query(*queries.LISTING_TABLES[listing]))
+    return queries.listing_validator(stamps.all())
+
+
+async def fetch_page(db_session, stmt, keys):
+    args = queries.page_args(request.args)
+    after, before = queries.page_cursors(keys, args['after'], args['before'])
+    rows = await db_session.execute(queries.keyset(stmt, keys, after, before, args['limit']))
+    return queries.page_of(rows, keys, after, before, args['limit'])
+
+
+async def cache_call(method, *args):
+    if blocking_cache:
+        return await asyncio.get_running_loop().run_in_executor(None, method, *args)
+    return method(*args)
+
+
+async def fetch_detail(db_session, kind, id, model, shows_query, payload, version):
+    #cached per version of the page, like the Flask views
+    data = await cache_call(detail_cache.get, kind, id, version)
+    if data is None:
+        entity = await db_session.get(model, id)
+        if entity is None:
+            return None
+        data = payload(entity, await db_session.execute(shows_query(id)))
+        await cache_call(detail_cache.set, kind, id, data, version)
+    return data
+
+
+def not_found():
+    return render_template('errors/404.html'), 404
+
+
+@handles('venues.venues')
+async def venues(db_session):
+    async def build():
+        stmt = queries.venues_query(request.args.get('city'), request.args.get('state'), request.args.get('genre'))
+        page = queries.group_areas(queries.venue_items(await fetch_page(db_session, stmt, queries.VENUE_KEYS)))
+        return render_template('pages/venues.html', areas=page.items, page=page)
+    return await conditional_page(await listing_validator(db_session, 'venues'), build)
+
+
+@handles('artists.artists')
+async def artists(db_session):
+    async def build():
+        stmt = queries.artists_query(request.args.get('genre'))
+        page = queries.artist_items(await fetch_page(db_session, stmt, queries.ARTIST_KEYS))
+        return render_template('pages/artists.html', artists=page.items, page=page)
+    return await conditional_page(await listing_validator(db_session, 'artists'), build)
+
+
+@handles('shows.shows')
+async def shows(db_session):
+    async def build():
+        page = queries.show_items(await fetch_page(db_session, queries.shows_query(), queries.SHOW_KEYS))
+        return render_template('pages/shows.html', shows=page.items, page=page)
+    return await conditional_page(await listing_validator(db_session, 'shows'), build)
+
+
+@handles('venues.show_venue')
+async def show_venue(db_session, venue_id):
+    stamps = await db_session.execute(queries.venue_stamps_query(venue_id))
+    validator = queries.detail_validator(stamps.first())
+    if validator is None:
+        return make_response(not_found())
+    #scored once, for the validator and the page
+    matches = match_index.matches('venue', [venue_id], flask_app.config['MATCH_LIMIT'])[0]
+    #the payload is cached on the venue's stamps, the page's ETag adds the matches
+    version = validator[0]
+    validator = matching.stamped(validator, matches)
+
+    async def build():
+        data = await fetch_detail(db_session, 'venue', venue_id, Venue, queries.venue_shows_query, queries.venue_payload, version)
+        if data is None:
+            return not_found()
+        return render_template('pages/show_venue.html', venue=data, matches=matches)
+    return await conditional_page(validator, build)
+
+
+@handles('artists.show_artist')
+async def show_artist(db_session, artist_id):
+    stamps = await db_session.execute(queries.artist_stamps_query(artist_id))
+    validator = queries.detail_validator(stamps.first())
+    if validator is None:
+        return make_response(not_found())
+    #scored once, for the validator and the page
+    matches = match_index.matches('artist', [artist_id], flask_app.config['MATCH_LIMIT'])[0]
+    #the payload is cached on the artist's stamps, the page's ETag adds the matches
+    version = validator[0]
+    validator = matching.stamped(validator, matches)
+
+    async def build():
+        data = await fetch_detail(db_session, 'artist', artist_id, Artist, queries.artist_shows_query, queries.artist_payload, version)
+        if data is None:
+            return not_found()
+        return render_template('pages/show_artist.html', artist=data, matches=matches)
+    return await conditional_page(validator, build)
+
+
+async def serve_async(environ):
+    # the Flask request context routes the request (request.endpoint) and
+    # gives the templates url_for, the session and the config; its context
+    # variables are local to this task, so it can stay pushed across awaits.
+    # returns None when the request is for the Flask app
+    with flask_app.request_context(environ):
+        handler = HANDLERS.get(request.endpoint)
+        #flashed messages are consumed by the Flask app, which saves the session
+        if handler is None or request.method not in ('GET', 'HEAD') or '_flashes' in session:
+            return None
+        try:
+            async with Session() as db_session:
+                return await handler(db_session, **request.view_args)
+        except Exception:
+            flask_app.logger.exception('Exception on %s [%s]', request.path, request.method)
+            return make_response((render_template('errors/500.html'), 500))
+
+
+#----------------------------------------------------------------------------#
+# ASGI <-> WSGI plumbing.
+#----------------------------------------------------------------------------#
+
+async def read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+def build_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        value = value.decode('latin-1')
+        environ[name] = environ[name] + ',' + value if name in environ else value
+    return environ
+
+
+def encode_headers(headers):
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+
+async def send_response(send, response, head):
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': encode_headers(response.headers.to_wsgi_list())
+    })
+    await send({'type': 'http.response.body', 'body': b'' if head else response.get_data()})
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def serve_wsgi(environ, send):
+    # the Flask app runs in one worker thread for the whole response, so
+    # streamed responses (exports) keep their request context; chunks are
+    # handed over through a bounded queue that holds the thread back while
+    # the client is slower than the app
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=8)
+    aborted = False
+
+    def put(message):
+        if aborted:
+            raise ClientDisconnected()
+        asyncio.run_coroutine_threadsafe(queue.put(message), loop).result()
+
+    def run():
+        started = False
+
+        def start_response(status, headers, exc_info=None):
+            nonlocal started
+            started = True
+            put({'type': 'http.response.start', 'status': int(status.split(' ', 1)[0]), 'headers': encode_headers(headers)})
+
+        try:
+            iterable = flask_app(environ, start_response)
+            try:
+                for chunk in iterable:
+                    if chunk:
+                        put({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+        except ClientDisconnected:
+            return
+        except Exception:
+            #only reached when the app propagates exceptions (debug mode)
+            flask_app.logger.exception('Exception on %s [%s]', environ['PATH_INFO'], environ['REQUEST_METHOD'])
+            if not started:
+                put({'type': 'http.response.start', 'status': 500, 'headers': []})
+        put({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    worker = loop.run_in_executor(None, run)
+    try:
+        while True:
+            message = await queue.get()
+            await send(message)
+            if message['type'] == 'http.response.body' and not message['more_body']:
+                break
+    except BaseException:
+        #stop the thread at its next chunk, and unblock it if it waits on the queue
+        aborted = True
+        while not queue.empty():
+            queue.get_nowait()
+        raise
+    finally:
+        await worker
+
+
+def load_match_index():
+    with flask_app.app_context():
+        match_index.load()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            #before the first request, off the event loop: the detail pages
+            #score their recommendations on it
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, load_match_index)
+            except Exception as error:
+                flask_app.logger.exception('Loading the match index failed')
+                await send({'type': 'lifespan.startup.failed', 'message': str(error)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await engine.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    environ = build_environ(scope, await read_body(receive))
+    response = await serve_async(environ)
+    if response is not None:
+        await send_response(send, response, head=scope['method'] == 'HEAD')
+    else:
+        await serve_wsgi(environ, send)
@@ -0,0 +1,272 @@
+#----------------------------------------------------------------------------#
+# Static asset pipeline.
+#----------------------------------------------------------------------------#
+# `flask assets build` concatenates and minifies the stylesheet and script
+# bundles, copies every other file under static/ under a content-hashed
+# name, writes gzip and brotli variants next to the text files and records
+# the names in static/dist/manifest.json:
+#
+#   {"main.css": "main.3f2a9c1d.css", "ico/favicon.png": "ico/favicon.5b0e17aa.png", ...}
+#
+# Templates link through asset_url('ico/favicon.png') and
+# bundle_urls('main.css'); without a manifest (a fresh checkout, or while
+# editing the sources) they get the original files under /static.  Hashed
+# names change with their content, so /assets/ is served with an immutable
+# one year Cache-Control and the precompressed variant the client accepts.
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+import click
+from flask import abort, current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:  # pragma: no cover - optional dependency
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # pragma: no cover - optional dependency
+    rjsmin = None
+
+#bundle name -> source files under static/, in load order
+BUNDLES = {
+    'main.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    #loaded in <head>, before the page renders
+    'head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ],
+    #deferred, after jQuery
+    'main.js': [
+        'js/script.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ],
+}
+
+DIST = 'dist'
+URL_PATH = '/assets'
+MANIFEST = 'manifest.json'
+MAX_AGE = 365 * 24 * 60 * 60
+
+#already compressed formats are only fingerprinted
+COMPRESSIBLE = {'.css', '.js', '.map', '.json', '.svg', '.eot', '.ttf', '.otf', '.ico', '.txt'}
+#Content-Encoding -> file suffix, in order of preference at equal quality
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+#----------------------------------------------------------------------------#
+# Build.
+#----------------------------------------------------------------------------#
+
+def hashed_name(path, content):
+    root, ext = posixpath.splitext(path)
+    return '{}.{}{}'.format(root, hashlib.md5(content).hexdigest()[:8], ext)
+
+
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+
+
+def minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    # without rcssmin: drop comments and the whitespace around punctuation,
+    # leaving string literals alone; spaces before ':' are kept because
+    # they separate a descendant pseudo-class in selectors
+    parts = []
+    last = 0
+    for match in _CSS_TOKENS.finditer(text):
+        parts.append(_squeeze_css(text[last:match.start()]))
+        if match.group(1):
+            parts.append(match.group(1))
+        last = match.end()
+    parts.append(_squeeze_css(text[last:]))
+    return ''.join(parts).strip()
+
+
+def _squeeze_css(text):
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r' ?([{};,>]) ?', r'\1', text)
+    return re.sub(r': ', ':', text).replace(';}', '}')
+
+
+def minify_js(text):
+    if rjsmin is not None:
+        return rjsmin.jsmin(text)
+    #most of the scripts ship minified already
+    return text
+
+
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)(.*?)\1\s*\)')
+
+
+def rewrite_css_urls(text, source, manifest, static_url_path):
+    # relative url()s point next to the source stylesheet, which is not where
+    # the bundle is served from: they are resolved against static/ and made
+    # relative to the bundle in /assets/, pointing at the fingerprinted file
+    # or, for files that are not in static/, where they used to resolve
+    directory = posixpath.dirname(source)
+
+    def replace(match):
+        url = match.group(2)
+        if not url or url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        path, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+        path = posixpath.normpath(posixpath.join(directory, path))
+        url = manifest.get(path) or posixpath.relpath(posixpath.join(static_url_path, path), URL_PATH)
+        return 'url("{}{}")'.format(url, suffix)
+    return _CSS_URL.sub(replace, text)
+
+
+def read_bundle(static, static_url_path, name, manifest):
+    chunks = []
+    for source in BUNDLES[name]:
+        with open(os.path.join(static, source), encoding='utf-8') as f:
+            text = f.read()
+        if name.endswith('.css'):
+            chunks.append(minify_css(rewrite_css_urls(text, source, manifest, static_url_path)))
+        else:
+            #a script without a trailing semicolon must not run into the next one
+            chunks.append(minify_js(text).rstrip() + ';')
+    return '\n'.join(chunks).encode('utf-8')
+
+
+def write_asset(dist, name, content):
+    path = os.path.join(dist, *name.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    if posixpath.splitext(name)[1] not in COMPRESSIBLE:
+        return
+    with open(path + '.gz', 'wb') as f:
+        #mtime=0 keeps the output identical between builds
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+
+
+def static_files(static):
+    for directory, dirnames, filenames in os.walk(static):
+        if directory == static:
+            dirnames[:] = [d for d in dirnames if d != DIST]
+        for filename in filenames:
+            yield posixpath.relpath(os.path.join(directory, filename).replace(os.sep, '/'), static.replace(os.sep, '/'))
+
+
+def build(static, static_url_path):
+    # writes static/dist from scratch and returns the manifest; single files
+    # go first so the stylesheets can link the fonts and images they use
+    dist = os.path.join(static, DIST)
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {}
+    for path in sorted(static_files(static)):
+        with open(os.path.join(static, path), 'rb') as f:
+            content = f.read()
+        manifest[path] = hashed_name(path, content)
+        write_asset(dist, manifest[path], content)
+    for name in BUNDLES:
+        content = read_bundle(static, static_url_path, name, manifest)
+        manifest[name] = hashed_name(name, content)
+        write_asset(dist, manifest[name], content)
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+assets_cli = AppGroup('assets', help='Static asset bundles.')
+
+
+@assets_cli.command('build')
+def build_command():
+    """Bundle, fingerprint and precompress static/ into static/dist."""
+    manifest = build(current_app.static_folder, current_app.static_url_path)
+    current_app.extensions['assets'] = manifest
+    click.echo('{} assets, {} bundles written to {}{}'.format(
+        len(manifest) - len(BUNDLES), len(BUNDLES), os.path.join(current_app.static_folder, DIST),
+        '' if brotli is not None else ' (no brotli variants, install Brotli)'
+    ))
+
+
+#----------------------------------------------------------------------------#
+# Serving.
+#----------------------------------------------------------------------------#
+
+def load_manifest(static):
+    try:
+        with open(os.path.join(static, DIST, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def asset_url(path):
+    manifest = current_app.extensions['assets']
+    if manifest and path in manifest:
+        return url_for('assets', filename=manifest[path])
+    return url_for('static', filename=path)
+
+
+def bundle_urls(name):
+    manifest = current_app.extensions['assets']
+    if manifest and name in manifest:
+        return [url_for('assets', filename=manifest[name])]
+    return [url_for('static', filename=source) for source in BUNDLES[name]]
+
+
+def serve_asset(filename):
+    dist = os.path.join(current_app.static_folder, DIST)
+    path = safe_join(dist, filename)
+    if path is None or filename == MANIFEST:
+        abort(404)
+    #the best precompressed variant the client accepts, the plain file otherwise
+    candidates = [
+        (request.accept_encodings[encoding], encoding, suffix)
+        for encoding, suffix in ENCODINGS
+        if request.accept_encodings[encoding] > 0 and os.path.isfile(path + suffix)
+    ]
+    #type and name are those of the uncompressed file
+    options = dict(
+        mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        download_name=posixpath.basename(filename),
+        max_age=MAX_AGE
+    )
+    if candidates:
+        _, encoding, suffix = max(candidates, key=lambda c: c[0])
+        response = send_from_directory(dist, filename + suffix, **options)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_from_directory(dist, filename, **options)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    app.extensions['assets'] = load_manifest(app.static_folder)
+    app.add_url_rule(URL_PATH + '/<path:filename>', 'assets', serve_asset)
+    app.add_template_global(asset_url)
+    app.add_template_global(bundle_urls)
+    app.cli.add_command(assets_cli)
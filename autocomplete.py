@@ -0,0 +1,131 @@
+#----------------------------------------------------------------------------#
+# In-process prefix index behind the artist/venue typeahead.
+#----------------------------------------------------------------------------#
+
+import heapq
+import re
+import threading
+
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+
+def _tokens(text):
+    return re.findall(r'\w+', text.lower())
+
+
+class PrefixIndex:
+    # maps every prefix (up to max_prefix characters) of every word of a name
+    # to the ids carrying it, so a lookup is a few dict hits and a set
+    # intersection instead of a database round trip.
+    # the index is filled from `loader` (an iterable of (id, name) rows) on
+    # first use and then kept current with add()/remove()
+
+    def __init__(self, loader, max_prefix=12):
+        self.loader = loader
+        self.max_prefix = max_prefix
+        self._names = {}
+        self._folded = {}
+        self._prefixes = {}
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def _keys(self, name):
+        keys = set()
+        for token in _tokens(name):
+            for size in range(1, min(len(token), self.max_prefix) + 1):
+                keys.add(token[:size])
+        return keys
+
+    def _insert(self, id, name):
+        self._names[id] = name
+        self._folded[id] = name.lower()
+        for key in self._keys(name):
+            self._prefixes.setdefault(key, set()).add(id)
+
+    def _delete(self, id):
+        name = self._names.pop(id, None)
+        if name is None:
+            return
+        del self._folded[id]
+        for key in self._keys(name):
+            ids = self._prefixes.get(key)
+            if ids is not None:
+                ids.discard(id)
+                if not ids:
+                    del self._prefixes[key]
+
+    def load(self):
+        with self._lock:
+            self._names = {}
+            self._folded = {}
+            self._prefixes = {}
+            for id, name in self.loader():
+                self._insert(id, name)
+            self._loaded = True
+
+    def add(self, id, name):
+        #also used for renames: the old name's prefixes are dropped first.
+        #before the first load there is nothing to update, the load reads
+        #the committed row anyway
+        with self._lock:
+            if not self._loaded:
+                return
+            self._delete(id)
+            self._insert(id, name)
+
+    def remove(self, id):
+        with self._lock:
+            if self._loaded:
+                self._delete(id)
+
+    def lookup(self, query, limit=10):
+        if not self._loaded:
+            self.load()
+
+        tokens = _tokens(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            candidates = [self._prefixes.get(token[:self.max_prefix], set()) for token in tokens]
+            candidates.sort(key=len)
+            ids = candidates[0].intersection(*candidates[1:])
+
+            #words longer than the indexed prefixes are checked against the name
+            long_tokens = [token for token in tokens if len(token) > self.max_prefix]
+            folded = self._folded
+            if long_tokens:
+                ids = [
+                    id for id in ids
+                    if all(any(word.startswith(token) for word in _tokens(folded[id])) for token in long_tokens)
+                ]
+
+            #names starting with the query first, then alphabetically
+            query = query.strip().lower()
+            starting = [id for id in ids if folded[id].startswith(query)]
+            best = heapq.nsmallest(limit, starting, key=folded.__getitem__)
+            if len(best) < limit:
+                others = (id for id in ids if not folded[id].startswith(query))
+                best += heapq.nsmallest(limit - len(best), others, key=folded.__getitem__)
+            return [{"id": id, "name": self._names[id]} for id in best]
+
+
+#the current application's indexes, updated by the create/edit/delete views
+venue_index = LocalProxy(lambda: current_app.extensions['autocomplete']['venues'])
+artist_index = LocalProxy(lambda: current_app.extensions['autocomplete']['artists'])
+
+
+def init_app(app):
+    #artist and venue names kept in memory for the show form typeahead
+    from models import db, Venue, Artist
+
+    indexes = app.extensions['autocomplete'] = {
+        'venues': PrefixIndex(lambda: db.session.query(Venue.id, Venue.name)),
+        'artists': PrefixIndex(lambda: db.session.query(Artist.id, Artist.name)),
+    }
+
+    @app.before_first_request
+    def load_autocomplete_indexes():
+        for index in indexes.values():
+            index.load()
@@ -0,0 +1,126 @@
+#----------------------------------------------------------------------------#
+# Concurrent-request throughput: app.run() (threaded WSGI) vs asgi.py.
+#
+# Starts each server on its own port against the configured database (fill
+# it first with `flask seed --scale 10k`), fires the read-only pages at it
+# from `--concurrency` client threads and reports requests per second and
+# latency percentiles.
+#
+#   python -m benchmarks.asgi_throughput --concurrency 1,10,50 --requests 2000
+#----------------------------------------------------------------------------#
+
+import argparse
+import http.client
+import itertools
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'wsgi': [sys.executable, '-c',
+             'from app import create_app; create_app().run(port={port}, threaded=True, debug=False, use_reloader=False)'],
+    'asgi': [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', '{port}', '--log-level', 'warning'],
+}
+
+
+def paths(venue_id, artist_id):
+    return ['/venues', '/artists', '/shows', '/venues/{}'.format(venue_id), '/artists/{}'.format(artist_id)]
+
+
+def start(name, port):
+    command = [part.format(port=port) for part in SERVERS[name]]
+    server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    sys.exit('{} server did not start on port {}'.format(name, port))
+
+
+def client(port, urls, count):
+    #one keep-alive connection per client thread, reopened after errors
+    timings, errors = [], 0
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    for url in itertools.islice(itertools.cycle(urls), count):
+        started = time.perf_counter()
+        try:
+            connection.request('GET', url)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        timings.append(time.perf_counter() - started)
+    connection.close()
+    return timings, errors
+
+
+def run(port, urls, concurrency, requests):
+    per_client = max(1, requests // concurrency)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        #each client starts at a different page so they do not move in lockstep
+        results = list(pool.map(
+            lambda i: client(port, urls[i % len(urls):] + urls[:i % len(urls)], per_client),
+            range(concurrency)
+        ))
+    elapsed = time.perf_counter() - started
+    timings = sorted(t for result in results for t in result[0])
+    return {
+        "rps": round(len(timings) / elapsed, 1),
+        "median_ms": round(statistics.median(timings) * 1000, 2),
+        "p95_ms": round(timings[int(0.95 * (len(timings) - 1))] * 1000, 2),
+        "errors": sum(result[1] for result in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare WSGI and ASGI throughput on the read-only pages.')
+    parser.add_argument('--concurrency', default='1,10,50', help='comma separated client counts')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per run')
+    parser.add_argument('--servers', default='wsgi,asgi')
+    parser.add_argument('--port', type=int, default=5100, help='first port, one per server')
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app()
+    from models import db, Venue, Artist
+
+    with app.app_context():
+        venue_id = db.session.execute(select(func.min(Venue.id))).scalar()
+        artist_id = db.session.execute(select(func.min(Artist.id))).scalar()
+    if venue_id is None or artist_id is None:
+        sys.exit('The database is empty, run `flask seed` first.')
+    urls = paths(venue_id, artist_id)
+
+    for offset, name in enumerate(args.servers.split(',')):
+        port = args.port + offset
+        server = start(name, port)
+        try:
+            #warm up: templates, connection pools, detail cache
+            run(port, urls, 1, len(urls) * 2)
+            for concurrency in [int(c) for c in args.concurrency.split(',')]:
+                result = run(port, urls, concurrency, args.requests)
+                print('{:<5} {:>4} clients {rps:>9.1f} req/s {median_ms:>9.2f}ms {p95_ms:>9.2f}ms p95 {errors:>4} errors'.format(name, concurrency, **result))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#----------------------------------------------------------------------------#
+# EXPLAIN check: the hot queries of the views can use their indexes.
+#
+#   python -m benchmarks.explain_indexes [--planner-choice]
+#
+# By default sequential scans are disabled for the check, so on a small
+# development database it verifies that each query *can* be served by its
+# index. --planner-choice keeps the planner's own costing, which is the
+# meaningful check on production-sized data.
+#----------------------------------------------------------------------------#
+
+import argparse
+import sys
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+
+def checks(venue_id, artist_id, city, state, now):
+    #(view, statement, index it must use)
+    import queries
+    from models import Show
+    return [
+        ('show_venue', queries.venue_shows_query(venue_id), 'ix_shows_venue_id_start_time'),
+        ('show_artist', queries.artist_shows_query(artist_id), 'ix_shows_artist_id_start_time'),
+        ('shows', queries.keyset(queries.shows_query(), queries.SHOW_KEYS, after=[now, 0]), 'ix_shows_start_time'),
+        ('venues', queries.keyset(queries.venues_query(), queries.VENUE_KEYS, after=[state, city, venue_id]), 'ix_venues_state_city_id'),
+        ('venues (area)', queries.venues_query(city, state), 'ix_venues_city_state'),
+        ('rollover', select(Show.id).where(~Show.counted_past, Show.start_time < now), 'ix_shows_not_counted_past'),
+    ]
+
+
+def used_indexes(plan):
+    found = set()
+    if 'Index Name' in plan:
+        found.add(plan['Index Name'])
+    for child in plan.get('Plans', []):
+        found |= used_indexes(child)
+    return found
+
+
+def explain(connection, stmt):
+    compiled = stmt.compile(dialect=connection.dialect)
+    result = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params)
+    return result.scalar()[0]['Plan']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that the views use their indexes.')
+    parser.add_argument('--planner-choice', action='store_true',
+                        help='keep sequential scans enabled')
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app()
+    from models import db, Venue, Artist
+
+    failures = 0
+    with app.app_context():
+        connection = db.session.connection()
+        if not args.planner_choice:
+            connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+
+        venue = db.session.execute(select(Venue.id, Venue.city, Venue.state).order_by(Venue.id).limit(1)).first()
+        artist_id = db.session.execute(select(func.min(Artist.id))).scalar()
+        if venue is None or artist_id is None:
+            sys.exit('The database is empty, run `flask seed` first.')
+
+        for view, stmt, index in checks(venue.id, artist_id, venue.city, venue.state, datetime.now()):
+            indexes = used_indexes(explain(connection, stmt))
+            ok = index in indexes
+            failures += not ok
+            print('{:<4} {:<16} expects {:<32} uses {}'.format('ok' if ok else 'FAIL', view, index, ', '.join(sorted(indexes)) or 'no index'))
+        db.session.rollback()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#----------------------------------------------------------------------------#
+# Benchmark: |datetime filter, legacy string round trip vs formatting module.
+#
+#   python -m benchmarks.format_datetime [--shows 100000]
+#----------------------------------------------------------------------------#
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+from formatting import format_datetime
+
+
+def legacy_format_datetime(value, format='medium'):
+    #the filter as it was: every call re-parses a string
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+def legacy_shows(start_times):
+    #shows(): stringify and format 'medium', then the template parses that
+    #output again and formats it 'full'
+    return [legacy_format_datetime(legacy_format_datetime(str(start)), 'full') for start in start_times]
+
+
+def current_shows(start_times):
+    #shows(): datetimes go straight to the template, formatted once
+    return [format_datetime(start, 'full') for start in start_times]
+
+
+def make_start_times(count, seed=0):
+    #shows start on the hour or half hour over the coming year
+    rng = random.Random(seed)
+    base = datetime(2021, 1, 1, 18, 0)
+    return [base + timedelta(days=rng.randrange(365), minutes=30 * rng.randrange(12)) for _ in range(count)]
+
+
+def timed(func, start_times):
+    started = time.perf_counter()
+    func(start_times)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--shows', type=int, default=100000)
+    args = parser.parse_args()
+
+    start_times = make_start_times(args.shows)
+    assert format_datetime(start_times[0], 'full') == legacy_format_datetime(str(start_times[0]), 'full')
+
+    legacy = timed(legacy_shows, start_times)
+    current = timed(current_shows, start_times)
+    print('{} shows'.format(args.shows))
+    print('legacy filter : {:8.3f}s'.format(legacy))
+    print('formatting    : {:8.3f}s  ({:.0f}x faster)'.format(current, legacy / current))
+
+
+if __name__ == '__main__':
+    main()
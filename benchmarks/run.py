@@ -0,0 +1,149 @@
+#----------------------------------------------------------------------------#
+# Per-view benchmark suite.
+#
+# Drives the views through the Flask test client against the configured
+# database (fill it first with `flask seed --scale 10k`) and records, per
+# route, latency, SQL statement count and peak Python memory.
+#
+#   python -m benchmarks.run --name 10k --update   # record a baseline
+#   python -m benchmarks.run --name 10k            # compare, exit 1 on regression
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+from sqlalchemy import func, select
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+
+def routes(venue_id, artist_id, city, state):
+    #(name, method, url, form data) for every read view; views that write
+    #(create/edit/delete submissions) are left out so runs are repeatable.
+    #availability is asked for the city with the most venues, a month ahead
+    today = date.today()
+    availability = urlencode({
+        'city': city, 'state': state,
+        'from': today.isoformat(), 'to': (today + timedelta(days=30)).isoformat()
+    })
+    return [
+        ('index', 'GET', '/', None),
+        ('venues', 'GET', '/venues', None),
+        ('search_venues', 'POST', '/venues/search', {'search_term': 'blue'}),
+        ('show_venue', 'GET', '/venues/{}'.format(venue_id), None),
+        ('create_venue_form', 'GET', '/venues/create', None),
+        ('edit_venue', 'GET', '/venues/{}/edit'.format(venue_id), None),
+        ('artists', 'GET', '/artists', None),
+        ('search_artists', 'POST', '/artists/search', {'search_term': 'blue'}),
+        ('show_artist', 'GET', '/artists/{}'.format(artist_id), None),
+        ('create_artist_form', 'GET', '/artists/create', None),
+        ('edit_artist', 'GET', '/artists/{}/edit'.format(artist_id), None),
+        ('shows', 'GET', '/shows', None),
+        ('create_shows', 'GET', '/shows/create', None),
+        ('autocomplete_names', 'GET', '/autocomplete/venues?q=the', None),
+        ('export_shows', 'GET', '/export/shows.ndjson', None),
+        ('api_venues', 'GET', '/api/v1/venues', None),
+        ('api_venue', 'GET', '/api/v1/venues/{}'.format(venue_id), None),
+        ('api_availability', 'GET', '/api/v1/venues/availability?' + availability, None),
+    ]
+
+
+def measure(client, method, url, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.open(url, method=method, data=data)
+        response.get_data()
+        timings.append(time.perf_counter() - started)
+
+    #one more run under tracemalloc for the peak allocation of the request
+    tracemalloc.start()
+    response = client.open(url, method=method, data=data)
+    response.get_data()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "status": response.status_code,
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(timings[int(0.95 * (len(timings) - 1))] * 1000, 3),
+        "queries": int(response.headers.get('X-DB-Queries', 0)),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def regressions(results, baseline, tolerance):
+    #latency and memory may grow by `tolerance`, query counts may not grow at all
+    found = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['median_ms'] > base['median_ms'] * tolerance:
+            found.append('{}: median {}ms > baseline {}ms'.format(name, result['median_ms'], base['median_ms']))
+        if result['queries'] > base['queries']:
+            found.append('{}: {} queries > baseline {}'.format(name, result['queries'], base['queries']))
+        if result['peak_kb'] > base['peak_kb'] * tolerance:
+            found.append('{}: peak {}KB > baseline {}KB'.format(name, result['peak_kb'], base['peak_kb']))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every read view.')
+    parser.add_argument('--name', default='default', help='baseline name, e.g. the seed scale')
+    parser.add_argument('--repeat', type=int, default=20, help='timed requests per route')
+    parser.add_argument('--tolerance', type=float, default=1.25)
+    parser.add_argument('--update', action='store_true', help='store the results as the new baseline')
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app()
+    from models import db, Venue, Artist
+
+    app.config['TESTING'] = True
+    client = app.test_client()
+    with app.app_context():
+        venue_id = db.session.execute(select(func.min(Venue.id))).scalar()
+        artist_id = db.session.execute(select(func.min(Artist.id))).scalar()
+        city, state = db.session.execute(
+            select(Venue.city, Venue.state).group_by(Venue.city, Venue.state).order_by(func.count().desc()).limit(1)
+        ).first() or (None, None)
+    if venue_id is None or artist_id is None:
+        sys.exit('The database is empty, run `flask seed` first.')
+
+    #warm up: first-request hooks, template compilation, connection pool
+    client.get('/')
+
+    results = {}
+    for name, method, url, data in routes(venue_id, artist_id, city, state):
+        results[name] = measure(client, method, url, data, args.repeat)
+        print('{:<20} {status:>4} {median_ms:>10.3f}ms {p95_ms:>10.3f}ms {queries:>4} queries {peak_kb:>10.1f}KB'.format(name, **results[name]))
+
+    path = os.path.join(BASELINE_DIR, args.name + '.json')
+    if args.update or not os.path.exists(path):
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print('Baseline written to {}'.format(path))
+        return
+
+    with open(path) as f:
+        baseline = json.load(f)
+    found = regressions(results, baseline, args.tolerance)
+    for line in found:
+        print('REGRESSION ' + line)
+    if found:
+        sys.exit(1)
+    print('No regressions against {}'.format(path))
+
+
+if __name__ == '__main__':
+    main()
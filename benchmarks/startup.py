@@ -0,0 +1,87 @@
+#----------------------------------------------------------------------------#
+# Worker and CLI startup time.
+#
+# Runs each step in fresh interpreters and reports the median wall time of
+# the whole process, of the step itself, and how many modules were loaded:
+# importing app.py, create_app(), warm_up() (what the gunicorn master does
+# before forking) and a first request (the database must be reachable for
+# those two), plus `flask --help` as a CLI invocation.
+#
+#   python -m benchmarks.startup --runs 10
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#name -> statements timed in a fresh interpreter, after `import app` where needed
+STEPS = {
+    'import app': 'import app',
+    'create_app': 'import app; a = app.create_app()',
+    'first request': "import app; a = app.create_app(); a.test_client().get('/')",
+    'warm_up + first request': "import app; a = app.create_app(); app.warm_up(a); a.test_client().get('/')",
+}
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+{statement}
+print(json.dumps({{"step": time.perf_counter() - started, "modules": len(sys.modules),
+                  "lazy": sorted(m for m in ('wtforms', 'babel', 'dateutil', 'alembic') if m in sys.modules)}}))
+"""
+
+
+def run_step(statement):
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD.format(statement=statement)],
+        cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process'] = time.perf_counter() - started
+    return result
+
+
+def run_cli(args):
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, '-m', 'flask'] + args, cwd=ROOT, check=True,
+        capture_output=True, env=dict(os.environ, FLASK_APP='app.py')
+    )
+    return {"process": time.perf_counter() - started}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app import, factory, warm-up and CLI startup time.')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per step')
+    parser.add_argument('--steps', default=','.join(STEPS), help='comma separated step names')
+    parser.add_argument('--no-cli', action='store_true', help='skip `flask --help`')
+    args = parser.parse_args()
+
+    for name in args.steps.split(','):
+        try:
+            results = [run_step(STEPS[name]) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print('{:<24} failed: {}'.format(name, e.stderr.strip().splitlines()[-1]))
+            continue
+        print('{:<24} {:>9.1f}ms process {:>9.1f}ms step {:>6} modules  lazy loaded: {}'.format(
+            name,
+            statistics.median(r['process'] for r in results) * 1000,
+            statistics.median(r['step'] for r in results) * 1000,
+            results[-1]['modules'],
+            ', '.join(results[-1]['lazy']) or '-'
+        ))
+
+    if not args.no_cli:
+        results = [run_cli(['--help']) for _ in range(args.runs)]
+        print('{:<24} {:>9.1f}ms process'.format('flask --help', statistics.median(r['process'] for r in results) * 1000))
+
+
+if __name__ == '__main__':
+    main()
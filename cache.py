@@ -0,0 +1,183 @@
+#----------------------------------------------------------------------------#
+# Read-through cache for assembled page payloads.
+#----------------------------------------------------------------------------#
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+
+class LRUCache:
+    # in-process backend: least recently used entries are dropped past
+    # maxsize and every entry expires ttl seconds after it was stored
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class LocalClient:
+    # stand-in for a shared key-value server, exposing the subset of the
+    # redis-py client used by SharedCache (get, set with ex, delete)
+
+    def __init__(self):
+        self._store = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            entry = self._store.get(name)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires < time.monotonic():
+                del self._store[name]
+                return None
+            return value
+
+    def set(self, name, value, ex=None):
+        with self._lock:
+            self._store[name] = (time.monotonic() + ex if ex else None, value)
+        return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(self._store.pop(name, None) is not None for name in names)
+
+    def flushdb(self):
+        with self._lock:
+            self._store.clear()
+
+
+class SharedCache:
+    # backend on a shared server (redis or LocalClient), so every worker sees
+    # the same entries and an invalidation in one worker applies to all
+
+    def __init__(self, client, ttl=300, prefix='fyyur:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        self.client.flushdb()
+
+
+def make_backend(config, ttl=None, maxsize=None):
+    #CACHE_TYPE 'memory' keeps entries per worker, 'shared' uses CACHE_REDIS_URL
+    #or, when that is not set, an in-process LocalClient stand-in.
+    #ttl and maxsize default to CACHE_TTL and CACHE_MAXSIZE
+    ttl = ttl or config.get('CACHE_TTL', 300)
+    maxsize = maxsize or config.get('CACHE_MAXSIZE', 1024)
+    if config.get('CACHE_TYPE', 'memory') == 'shared':
+        url = config.get('CACHE_REDIS_URL')
+        if url:
+            import redis
+            client = redis.Redis.from_url(url)
+        else:
+            client = LocalClient()
+        return SharedCache(client, ttl=ttl)
+    return LRUCache(maxsize=maxsize, ttl=ttl)
+
+
+class DetailCache:
+    # per-entity payload cache ('venue', 42) -> dict, with hit/miss counters.
+    # every entry is stored with the version it was built from (a page's
+    # validator values) and only returned for that version: with a backend
+    # per worker, an edit evicts the entry of the worker that made it, and
+    # the others must not send their older payload under the new ETag.
+    # without a version (a page with flashed messages skips its validator)
+    # the payload is built and neither read from nor written to the cache
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, kind, id):
+        return '{}:{}'.format(kind, id)
+
+    def get(self, kind, id, version=None):
+        entry = self.backend.get(self.key(kind, id)) if version is not None else None
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def set(self, kind, id, value, version=None):
+        #missing entities are not cached so a later create shows up at once
+        if value is not None and version is not None:
+            self.backend.set(self.key(kind, id), (version, value))
+
+    def get_or_build(self, kind, id, build, version=None):
+        value = self.get(kind, id, version)
+        if value is None:
+            value = build(id)
+            self.set(kind, id, value, version)
+        return value
+
+    def invalidate(self, kind, *ids):
+        self.backend.delete(*[self.key(kind, id) for id in ids])
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+
+#the current application's DetailCache, for the views and commands
+detail_cache = LocalProxy(lambda: current_app.extensions['detail_cache'])
+
+
+def init_app(app):
+    #assembled venue/artist detail payloads, evicted by the views that change them
+    app.extensions['detail_cache'] = DetailCache(make_backend(app.config))
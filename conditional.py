@@ -0,0 +1,51 @@
+#----------------------------------------------------------------------------#
+# Conditional GET (ETag / Last-Modified) for read-only pages.
+#----------------------------------------------------------------------------#
+
+import functools
+import hashlib
+
+from flask import make_response, request, session
+from werkzeug.http import is_resource_modified
+from werkzeug.wrappers import Response
+
+
+def validate(validator):
+    # (etag, last_modified, modified) of the current request's page for a
+    # (values, last_modified) validator
+    values, last_modified = validator
+    #the query string selects the page, so it is part of the validator
+    etag = hashlib.sha1(repr((request.full_path, values)).encode()).hexdigest()
+    modified = is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+    return etag, last_modified, modified
+
+
+def finish(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    #caches may keep the page but must revalidate it on every use
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional(stamps):
+    # `stamps` receives the view arguments and returns (values, last_modified)
+    # from cheap change-stamp queries, or None to skip validation.
+    # a matching If-None-Match / If-Modified-Since is answered with 304
+    # before the view runs, so no page query or template render happens
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            #flashed messages are part of the page, never hide them behind a 304
+            if '_flashes' in session:
+                return view(*args, **kwargs)
+
+            validator = stamps(*args, **kwargs)
+            if validator is None:
+                return view(*args, **kwargs)
+            etag, last_modified, modified = validate(validator)
+            response = make_response(view(*args, **kwargs)) if modified else Response(status=304)
+            return finish(response, etag, last_modified)
+        return wrapper
+    return decorator
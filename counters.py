@@ -0,0 +1,134 @@
+#----------------------------------------------------------------------------#
+# Denormalized show counters (flask rollover).
+#----------------------------------------------------------------------------#
+# venues and artists carry upcoming_shows_count / past_shows_count, changed
+# in the same transaction as the shows they count: count_shows() when shows
+# are inserted, uncount_shows() before they are deleted.  shows.counted_past
+# records which counter a show is in, and roll_over() moves the shows whose
+# start time has passed from the upcoming to the past counter.
+
+import time
+from collections import Counter
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, func, select, update
+
+from models import db, Venue, Artist, Show
+
+#counted model, its cache kind and the show column pointing at it
+COUNTED = (
+    (Venue, 'venue', Show.venue_id),
+    (Artist, 'artist', Show.artist_id),
+)
+
+
+def _add(model, upcoming, past):
+    #upcoming / past: Counter of id -> delta, applied in one executemany;
+    #rows are updated in id order so concurrent writers lock them alike
+    ids = sorted(set(upcoming) | set(past))
+    if not ids:
+        return
+    table = model.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.id == bindparam('row_id'))
+        .values(
+            upcoming_shows_count=table.c.upcoming_shows_count + bindparam('upcoming'),
+            past_shows_count=table.c.past_shows_count + bindparam('past')
+        ),
+        [{"row_id": id, "upcoming": upcoming[id], "past": past[id]} for id in ids]
+    )
+
+
+def count_shows(shows, now=None):
+    #shows: dicts about to be inserted, each gets its counted_past flag
+    if now is None:
+        now = datetime.now()
+    deltas = {model: (Counter(), Counter()) for model, _, _ in COUNTED}
+    for show in shows:
+        show['counted_past'] = show['start_time'] < now
+        for model, _, key in COUNTED:
+            upcoming, past = deltas[model]
+            (past if show['counted_past'] else upcoming)[show[key.key]] += 1
+    for model, (upcoming, past) in deltas.items():
+        _add(model, upcoming, past)
+
+
+def uncount_shows(*criteria, skip=None):
+    #take the shows matching `criteria` off the counters, before deleting them;
+    #`skip` is a model whose rows go too, its counters are left alone
+    for model, _, key in COUNTED:
+        if model is skip:
+            continue
+        counts = (
+            select(
+                key.label('id'),
+                func.count().filter(~Show.counted_past).label('upcoming'),
+                func.count().filter(Show.counted_past).label('past')
+            )
+            .where(*criteria)
+            .group_by(key)
+            .subquery()
+        )
+        db.session.execute(
+            update(model)
+            .where(model.id == counts.c.id)
+            .values(
+                upcoming_shows_count=model.upcoming_shows_count - counts.c.upcoming,
+                past_shows_count=model.past_shows_count - counts.c.past
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+def roll_over(now=None):
+    #flag the shows that started since the last run as past and move them
+    #between the counters; safe to run any number of times.
+    #returns {cache kind: ids whose counters changed}
+    if now is None:
+        now = datetime.now()
+    #the venues and artists of those shows are locked first, venues before
+    #artists in id order like a booking or a delete takes them, and only the
+    #shows found then are flagged: one booked meanwhile waits for the next run
+    started = db.session.execute(
+        select(Show.id, Show.venue_id, Show.artist_id).where(~Show.counted_past, Show.start_time < now)
+    ).all()
+    for model, _, key in COUNTED:
+        ids = sorted({row._mapping[key.key] for row in started})
+        if ids:
+            db.session.execute(select(model.id).where(model.id.in_(ids)).order_by(model.id).with_for_update())
+    moved = db.session.execute(
+        update(Show.__table__)
+        .where(Show.id.in_([row.id for row in started]), ~Show.counted_past)
+        .values(counted_past=True)
+        .returning(Show.venue_id, Show.artist_id)
+    ).all() if started else []
+    changed = {}
+    for model, kind, key in COUNTED:
+        past = Counter(row._mapping[key.key] for row in moved)
+        upcoming = Counter({id: -count for id, count in past.items()})
+        _add(model, upcoming, past)
+        changed[kind] = sorted(past)
+    return changed
+
+
+@click.command('rollover')
+@click.option('--interval', type=float, default=0, show_default=True,
+              help='Seconds between runs; 0 runs once, e.g. from cron.')
+@with_appcontext
+def rollover_command(interval):
+    """Move shows that have started from the upcoming to the past counters."""
+    detail_cache = current_app.extensions['detail_cache']
+    while True:
+        changed = roll_over()
+        db.session.commit()
+        for kind, ids in changed.items():
+            if ids:
+                detail_cache.invalidate(kind, *ids)
+        click.echo('{} venues, {} artists rolled over'.format(len(changed['venue']), len(changed['artist'])))
+        if not interval:
+            break
+        time.sleep(interval)
@@ -0,0 +1,64 @@
+#----------------------------------------------------------------------------#
+# Deleting venues and artists.
+#----------------------------------------------------------------------------#
+# One DELETE statement removes any number of venues (or artists), and the
+# database removes their shows through the ON DELETE CASCADE foreign keys,
+# so no show row is ever loaded.  Before that, the shows are taken off the
+# counters of the other side (an artist loses the shows it had at a deleted
+# venue), and the ids whose pages showed them are collected for eviction.
+# The venue and artist rows involved are locked first, in the same order as
+# a booking takes them (see scheduling.py).
+
+from sqlalchemy import delete, select
+
+import counters
+import scheduling
+from autocomplete import venue_index, artist_index
+from cache import detail_cache
+from models import db, Venue, Artist, Show
+
+#kind -> (model, its show column, the other kind, the other kind's show column)
+KINDS = {
+    'venue': (Venue, Show.venue_id, 'artist', Show.artist_id),
+    'artist': (Artist, Show.artist_id, 'venue', Show.venue_id),
+}
+
+INDEXES = {'venue': venue_index, 'artist': artist_index}
+
+
+def delete_entities(kind, ids):
+    # deletes the venues or artists in `ids` in the current transaction and
+    # returns (deleted ids, ids of the other kind that had shows with them);
+    # ids that do not exist are ignored.  the caller commits, then calls
+    # forget() with the result
+    model, key, other_kind, other_key = KINDS[kind]
+    ids = sorted(set(ids))
+    # venues, then artists, are locked before any counter changes; the other
+    # side is read again once the deleted rows are locked, so shows booked
+    # in between are counted off and their pages evicted too
+    others = db.session.execute(select(other_key).where(key.in_(ids)).distinct()).scalars().all()
+    locked = {kind: ids, other_kind: others}
+    for side in ('venue', 'artist'):
+        scheduling.lock(KINDS[side][0], locked[side])
+    others = db.session.execute(select(other_key).where(key.in_(ids)).distinct()).scalars().all()
+    counters.uncount_shows(key.in_(ids), skip=model)
+    deleted = db.session.execute(
+        delete(model)
+        .where(model.id.in_(ids))
+        .returning(model.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    return deleted, others
+
+
+def forget(kind, deleted, others):
+    #after the commit: typeahead entries and cached pages of the deleted rows,
+    #and the pages of the other kind that listed their shows
+    from matching import match_index
+    for id in deleted:
+        INDEXES[kind].remove(id)
+        match_index.remove(kind, id)
+    if deleted:
+        detail_cache.invalidate(kind, *deleted)
+    if others:
+        detail_cache.invalidate(KINDS[kind][2], *others)
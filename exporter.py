@@ -0,0 +1,95 @@
+#----------------------------------------------------------------------------#
+# Streaming export of venues, artists and shows as NDJSON or CSV.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+import sys
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from models import db, Venue, Artist, Show
+
+#rows fetched per round trip from the server-side cursor
+YIELD_PER = 1000
+
+#same separator the importer splits list cells on
+LIST_SEPARATOR = ';'
+
+MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _columns(model):
+    return [column for column in model.__table__.columns if column.name != 'search_vector']
+
+
+def export_query(kind):
+    if kind == 'venues':
+        return select(*_columns(Venue)).order_by(Venue.id)
+    if kind == 'artists':
+        return select(*_columns(Artist)).order_by(Artist.id)
+    #shows carry the names of their artist and venue
+    return (
+        select(
+            Show.id,
+            Show.start_time,
+            Show.duration,
+            Show.venue_id,
+            Venue.name.label('venue_name'),
+            Show.artist_id,
+            Artist.name.label('artist_name')
+        )
+        .join(Venue, Show.venue_id == Venue.id)
+        .join(Artist, Show.artist_id == Artist.id)
+        .order_by(Show.id)
+    )
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return LIST_SEPARATOR.join(value)
+    return '' if value is None else value
+
+
+def generate(kind, fmt):
+    #yields the export chunk by chunk: one chunk per batch fetched from a
+    #server-side cursor, so memory stays flat whatever the table size
+    result = db.session.execute(export_query(kind).execution_options(stream_results=True)).yield_per(YIELD_PER)
+    keys = list(result.keys())
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(keys)
+        yield buffer.getvalue()
+        for rows in result.partitions():
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_csv_value(value) for value in row] for row in rows)
+            yield buffer.getvalue()
+    else:
+        for rows in result.partitions():
+            yield ''.join(json.dumps(dict(zip(keys, row)), default=str) + '\n' for row in rows)
+
+
+@click.command('export')
+@click.argument('kind', type=click.Choice(['artists', 'shows', 'venues']))
+@click.option('--format', 'fmt', type=click.Choice(sorted(MIMETYPES)), default='ndjson', show_default=True)
+@click.option('-o', '--output', type=click.Path(dir_okay=False, writable=True),
+              help='Write to this file instead of stdout.')
+@with_appcontext
+def export_command(kind, fmt, output):
+    """Stream venues, artists or shows as NDJSON or CSV."""
+    out = open(output, 'w', newline='', encoding='utf-8') if output else sys.stdout
+    try:
+        for chunk in generate(kind, fmt):
+            out.write(chunk)
+    finally:
+        if output:
+            out.close()
@@ -0,0 +1,39 @@
+#----------------------------------------------------------------------------#
+# Date/time formatting for templates.
+#----------------------------------------------------------------------------#
+
+import functools
+from datetime import datetime
+
+#named formats understood by the |datetime filter
+FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled(format, locale):
+    #the Babel pattern and locale are parsed once per (format, locale);
+    #Babel itself is only imported by the first page that formats a date
+    from babel import Locale
+    from babel.dates import parse_pattern
+    return parse_pattern(FORMATS.get(format, format)), Locale.parse(locale)
+
+
+@functools.lru_cache(maxsize=100000)
+def _format(value, format, locale):
+    #shows cluster on a few start times, so most calls are cache hits
+    pattern, locale = _compiled(format, locale)
+    if value.tzinfo is None:
+        from babel.dates import UTC
+        value = value.replace(tzinfo=UTC)
+    return pattern.apply(value, locale)
+
+
+def format_datetime(value, format='medium', locale='en'):
+    #takes datetime objects directly; strings are still accepted and parsed
+    if not isinstance(value, datetime):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    return _format(value, format, locale)
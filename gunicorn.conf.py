@@ -0,0 +1,30 @@
+#----------------------------------------------------------------------------#
+# gunicorn settings: gunicorn -c gunicorn.conf.py
+#----------------------------------------------------------------------------#
+# The app is built once in the master (preload_app) and warmed up there
+# before the workers are forked, so they start with every module imported
+# and every template compiled.  Each worker then opens its own database
+# connections.  PREFORK_WARM_UP = False in the config skips the warm-up.
+
+import multiprocessing
+import os
+
+wsgi_app = 'app:create_app()'
+bind = '0.0.0.0:{}'.format(os.environ.get('PORT', 5000))
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+
+
+def when_ready(server):
+    #runs in the master after the app is loaded, before any worker is forked
+    from app import warm_up
+    app = server.app.wsgi()
+    if app.config.get('PREFORK_WARM_UP', True):
+        warm_up(app)
+
+
+def post_fork(server, worker):
+    from app import fill_pool
+    app = server.app.wsgi()
+    if app.config.get('PREFORK_WARM_UP', True):
+        fill_pool(app)
@@ -0,0 +1,158 @@
+#----------------------------------------------------------------------------#
+# Bulk import of venues, artists and shows (flask import).
+#----------------------------------------------------------------------------#
+
+import csv
+import json
+import os
+import time
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select
+from werkzeug.datastructures import MultiDict
+
+from counters import count_shows
+from models import DEFAULT_SHOW_DURATION, db, Venue, Artist, Show
+
+#model and validating form (by name, forms.py loads WTForms) of each kind
+KINDS = {
+    'venues': (Venue, 'VenueForm'),
+    'artists': (Artist, 'ArtistForm'),
+    'shows': (Show, 'ShowForm'),
+}
+
+#CSV cells holding several values, e.g. "Jazz;Rock n Roll"
+LIST_SEPARATOR = ';'
+
+
+def read_rows(path, fmt):
+    #stream (line number, row dict) pairs without loading the file
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_num, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_num, json.loads(line)
+
+
+def to_formdata(row, form):
+    #shape a raw row like a submitted form so the form's own rules apply
+    data = MultiDict()
+    for name, value in row.items():
+        if name not in form or value is None:
+            continue
+        if isinstance(value, str) and form[name].type == 'SelectMultipleField':
+            value = [v.strip() for v in value.split(LIST_SEPARATOR) if v.strip()]
+        if isinstance(value, bool) or form[name].type == 'BooleanField':
+            value = 'y' if str(value).lower() in ('true', 'y', 'yes', '1') else ''
+        for item in (value if isinstance(value, list) else [value]):
+            data.add(name, item)
+    return data
+
+
+def insert_batch(model, batch):
+    #one executemany round trip and one transaction per batch
+    if model is Show:
+        #the venues and artists count the new shows in the same transaction
+        count_shows(batch)
+    db.session.execute(model.__table__.insert(), batch)
+    db.session.commit()
+
+
+def missing_references(batch):
+    #shows pointing at venues or artists that do not exist, checked per batch
+    venue_ids = {row['venue_id'] for _, row in batch}
+    artist_ids = {row['artist_id'] for _, row in batch}
+    found_venues = set(db.session.execute(select(Venue.id).where(Venue.id.in_(venue_ids))).scalars())
+    found_artists = set(db.session.execute(select(Artist.id).where(Artist.id.in_(artist_ids))).scalars())
+    errors = {}
+    for line_num, row in batch:
+        if row['venue_id'] not in found_venues:
+            errors[line_num] = 'venue_id: venue {} does not exist'.format(row['venue_id'])
+        elif row['artist_id'] not in found_artists:
+            errors[line_num] = 'artist_id: artist {} does not exist'.format(row['artist_id'])
+    return errors
+
+
+def import_rows(kind, rows, batch_size=5000, report=click.echo):
+    #validate rows with the matching form and insert them in batches,
+    #returns (imported, rejected)
+    import forms
+    model, form_name = KINDS[kind]
+    form_class = getattr(forms, form_name)
+    columns = set(model.__table__.columns.keys())
+    form = form_class(meta={'csrf': False})
+    #field defaults (e.g. ShowForm.start_time) must not fill in missing cells
+    blank = {field.name: None for field in form}
+    imported = rejected = 0
+    batch = []
+
+    def flush():
+        nonlocal imported, rejected
+        if kind == 'shows':
+            errors = missing_references(batch)
+            for line_num, message in errors.items():
+                report('line {}: {}'.format(line_num, message), err=True)
+            rejected += len(errors)
+            batch[:] = [(line_num, row) for line_num, row in batch if line_num not in errors]
+        if not batch:
+            return
+        try:
+            insert_batch(model, [row for _, row in batch])
+            imported += len(batch)
+        except Exception as e:
+            db.session.rollback()
+            rejected += len(batch)
+            report('lines {}-{}: batch rejected: {}'.format(batch[0][0], batch[-1][0], e), err=True)
+        batch.clear()
+        report('{}: {} imported, {} rejected'.format(kind, imported, rejected))
+
+    for line_num, row in rows:
+        form.process(to_formdata(row, form), **blank)
+        if not form.validate():
+            rejected += 1
+            for field, messages in form.errors.items():
+                report('line {}: {}: {}'.format(line_num, field, '; '.join(messages)), err=True)
+            continue
+
+        values = {field.name: field.data for field in form if field.name in columns}
+        if kind == 'shows':
+            try:
+                values['artist_id'] = int(values['artist_id'])
+                values['venue_id'] = int(values['venue_id'])
+            except (TypeError, ValueError):
+                rejected += 1
+                report('line {}: artist_id and venue_id must be numbers'.format(line_num), err=True)
+                continue
+            if values.get('duration') is None:
+                values['duration'] = DEFAULT_SHOW_DURATION
+        batch.append((line_num, values))
+
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    return imported, rejected
+
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(sorted(KINDS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+              help='File format, guessed from the extension by default.')
+@click.option('--batch-size', default=5000, show_default=True,
+              help='Rows inserted per transaction.')
+@with_appcontext
+def import_command(kind, path, fmt, batch_size):
+    """Bulk load venues, artists or shows from a CSV or JSONL file."""
+    if fmt is None:
+        fmt = 'csv' if os.path.splitext(path)[1].lower() == '.csv' else 'jsonl'
+
+    started = time.perf_counter()
+    imported, rejected = import_rows(kind, read_rows(path, fmt), batch_size)
+    elapsed = time.perf_counter() - started
+    click.echo('Done: {} {} imported, {} rejected in {:.1f}s'.format(imported, kind, rejected, elapsed))
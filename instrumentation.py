@@ -0,0 +1,113 @@
+#----------------------------------------------------------------------------#
+# Per-request SQL instrumentation and N+1 detection.
+#----------------------------------------------------------------------------#
+
+import re
+import time
+from collections import Counter, deque
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#statistics of the most recent requests, served by /debug/queries
+recent = deque(maxlen=100)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.time += elapsed
+        #bound parameters are already placeholders, so only whitespace varies
+        self.shapes[re.sub(r'\s+', ' ', statement).strip()] += 1
+
+    def repeated(self, threshold):
+        #statements run `threshold` times or more in one request: the
+        #signature of a query issued per row instead of once
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def query_budget(limit):
+    #maximum number of statements a view may run
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    if has_request_context() and 'db_stats' in g:
+        g.db_stats.record(statement, time.perf_counter() - started)
+
+
+def _handle_error(context):
+    #a failed statement never reaches after_cursor_execute: take its start
+    #time off the connection here, or it would be popped for the next one
+    conn = context.connection
+    if conn is None or not conn.info.get('query_started'):
+        return
+    started = conn.info['query_started'].pop()
+    if context.statement is not None and has_request_context() and 'db_stats' in g:
+        g.db_stats.record(context.statement, time.perf_counter() - started)
+
+
+def _start_request():
+    g.db_stats = QueryStats()
+
+
+def _finish_request(response):
+    stats = g.pop('db_stats', None)
+    if stats is None:
+        return response
+
+    response.headers['X-DB-Queries'] = str(stats.count)
+    response.headers['X-DB-Time'] = '{:.2f}ms'.format(stats.time * 1000)
+
+    repeated = stats.repeated(current_app.config['N_PLUS_ONE_THRESHOLD'])
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None) or current_app.config['QUERY_BUDGET']
+    recent.append({
+        "method": request.method,
+        "path": request.full_path,
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "queries": stats.count,
+        "time_ms": round(stats.time * 1000, 2),
+        "budget": budget,
+        "repeated": [{"statement": shape, "count": count} for shape, count in repeated]
+    })
+
+    for shape, count in repeated:
+        current_app.logger.warning('possible N+1 in %s: %d x %s', request.endpoint, count, shape)
+    if budget is not None and stats.count > budget:
+        message = '{} ran {} queries, budget is {}'.format(request.endpoint, stats.count, budget)
+        if current_app.config['QUERY_BUDGET_STRICT']:
+            raise QueryBudgetExceeded(message)
+        current_app.logger.warning(message)
+    return response
+
+
+def init_app(app):
+    app.config.setdefault('QUERY_BUDGET', None)
+    app.config.setdefault('QUERY_BUDGET_STRICT', False)
+    app.config.setdefault('N_PLUS_ONE_THRESHOLD', 5)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
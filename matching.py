@@ -0,0 +1,271 @@
+#----------------------------------------------------------------------------#
+# In-process artist / venue matching behind the detail page recommendations.
+#----------------------------------------------------------------------------#
+# Every venue and artist is a row of NumPy arrays: its genres as a unit
+# length multi-hot vector over GENRE_CHOICES, and its city and state as
+# integer codes.  The match score of an artist and a venue is
+#
+#   cosine of their genre vectors + CITY_WEIGHT (same city) + STATE_WEIGHT (same state)
+#
+# and only artists seeking a venue / venues seeking talent are candidates.
+# Scoring a batch of entities against the other side is one matrix product
+# and two broadcast comparisons, and the best `limit` per entity come from
+# argpartition, so a page gets its recommendations without a query.
+#
+# The arrays are filled from the database on first use and then kept
+# current with update()/remove() by the create, edit and delete views.
+
+import threading
+
+import numpy as np
+from flask import current_app, g
+from werkzeug.local import LocalProxy
+
+from models import GENRE_CHOICES
+
+GENRES = {name: column for column, (name, _) in enumerate(GENRE_CHOICES)}
+
+#location bonuses added to the genre cosine (which is at most 1)
+CITY_WEIGHT = 0.5
+STATE_WEIGHT = 0.25
+
+#the other side of a match: a venue is matched with artists and vice versa
+OTHER = {'venue': 'artist', 'artist': 'venue'}
+
+
+class Features:
+    # the rows of one side.  a removed row is zeroed and reused by the next
+    # entity added, the arrays double when they are full
+
+    def __init__(self, seeking, capacity=64):
+        #name of the column telling whether the entity looks for the other side
+        self.seeking = seeking
+        self.details = {}
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.genres = np.zeros((capacity, len(GENRES)), dtype=np.float32)
+        self.cities = np.full(capacity, -1, dtype=np.int32)
+        self.states = np.full(capacity, -1, dtype=np.int32)
+        #in use and seeking: may be recommended
+        self.open = np.zeros(capacity, dtype=bool)
+        self.size = 0
+        self.rows = {}
+        self.free = []
+
+    def _grow(self):
+        capacity = len(self.ids) * 2
+        for name in ('ids', 'genres', 'cities', 'states', 'open'):
+            old = getattr(self, name)
+            new = np.full((capacity,) + old.shape[1:], -1 if name in ('cities', 'states') else 0, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def fill(self, ids, genres, cities, states, seeking):
+        #the whole side at once, replacing its rows
+        self._allocate(max(len(self.ids), len(ids)))
+        size = self.size = len(ids)
+        self.ids[:size] = ids
+        self.genres[:size] = genres
+        self.cities[:size] = cities
+        self.states[:size] = states
+        self.open[:size] = seeking
+        self.rows = {id: row for row, id in enumerate(ids)}
+
+    def put(self, id, genres, city, state, seeking):
+        row = self.rows.get(id)
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            else:
+                if self.size == len(self.ids):
+                    self._grow()
+                row = self.size
+                self.size += 1
+            self.rows[id] = row
+        self.ids[row] = id
+        self.genres[row] = genres
+        self.cities[row] = city
+        self.states[row] = state
+        self.open[row] = seeking
+
+    def delete(self, id):
+        row = self.rows.pop(id, None)
+        if row is None:
+            return
+        self.details.pop(id, None)
+        self.ids[row] = 0
+        self.genres[row] = 0
+        self.cities[row] = self.states[row] = -1
+        self.open[row] = False
+        self.free.append(row)
+
+
+class MatchIndex:
+    # both sides, with the city / state codes they share.  `loaders` maps
+    # 'venue' and 'artist' to a callable returning rows with id, name,
+    # image_link, city, state, genres and the side's seeking column
+
+    def __init__(self, loaders, seeking):
+        self.loaders = loaders
+        self._seeking = seeking
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self):
+        self._sides = {kind: Features(seeking) for kind, seeking in self._seeking.items()}
+        self._locations = {}
+
+    def _code(self, key):
+        return self._locations.setdefault(key, len(self._locations))
+
+    def _encode(self, kind, items):
+        # genre matrix, city and state codes and seeking flags of `items`, with
+        # their details recorded on the side; one pass to collect, the genre
+        # vectors are then set and normalized as a whole
+        side = self._sides[kind]
+        genre_rows, genre_columns = [], []
+        cities, states, seeking = [], [], []
+        for row, item in enumerate(items):
+            for genre in set(item.genres or ()):
+                if genre in GENRES:
+                    genre_rows.append(row)
+                    genre_columns.append(GENRES[genre])
+            city = (item.city or '').strip().lower()
+            state = (item.state or '').strip().upper()
+            cities.append(self._code((city, state)) if city else -1)
+            states.append(self._code(('', state)) if state else -1)
+            seeking.append(bool(getattr(item, side.seeking)))
+            side.details[item.id] = {
+                "id": item.id,
+                "name": item.name,
+                "image_link": item.image_link,
+                "city": item.city,
+                "state": item.state,
+                "genres": list(item.genres or ())
+            }
+        genres = np.zeros((len(items), len(GENRES)), dtype=np.float32)
+        genres[genre_rows, genre_columns] = 1
+        norms = np.linalg.norm(genres, axis=1, keepdims=True)
+        np.divide(genres, norms, out=genres, where=norms > 0)
+        return genres, np.array(cities, dtype=np.int32), np.array(states, dtype=np.int32), np.array(seeking, dtype=bool)
+
+    def load(self):
+        with self._lock:
+            self._reset()
+            for kind, loader in self.loaders.items():
+                items = list(loader())
+                self._sides[kind].fill([item.id for item in items], *self._encode(kind, items))
+            self._loaded = True
+
+    def update(self, kind, item):
+        #a created or edited venue / artist, any object with the loader's columns.
+        #before the first load there is nothing to update, the load reads
+        #the committed row anyway
+        with self._lock:
+            if self._loaded:
+                genres, cities, states, seeking = self._encode(kind, [item])
+                self._sides[kind].put(item.id, genres[0], cities[0], states[0], seeking[0])
+
+    def remove(self, kind, id):
+        with self._lock:
+            if self._loaded:
+                self._sides[kind].delete(id)
+
+    def matches(self, kind, ids, limit):
+        # the best `limit` entities of the other side for each of `ids` (venues
+        # or artists, by `kind`), best first, each with its score; ids that
+        # are not indexed get no matches
+        if not self._loaded:
+            self.load()
+
+        with self._lock:
+            side, other = self._sides[kind], self._sides[OTHER[kind]]
+            rows = np.array([side.rows.get(id, -1) for id in ids], dtype=np.int64)
+            found = rows >= 0
+            results = [[] for _ in ids]
+            if not found.any() or not other.size or limit < 1:
+                return results
+            rows = rows[found]
+
+            scores = self.scores(side, rows, other)
+            #the `limit`-th best score of every row, from argpartition; the
+            #columns scoring at least that much (more than `limit` when there
+            #are ties at the cut) are then sorted by score, equal scores by id
+            limit = min(limit, other.size)
+            best = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+            cut = np.take_along_axis(scores, best, axis=1).min(axis=1)
+
+            for position, row_scores, row_cut in zip(np.flatnonzero(found), scores, cut):
+                candidates = np.flatnonzero((row_scores >= row_cut) & (row_scores > 0))
+                order = np.lexsort((other.ids[candidates], -row_scores[candidates]))[:limit]
+                results[position] = [
+                    dict(other.details[int(other.ids[column])], score=round(float(row_scores[column]), 3))
+                    for column in candidates[order]
+                ]
+            return results
+
+    @staticmethod
+    def scores(side, rows, other):
+        # len(rows) x other.size score matrix; rows of `other` that are
+        # removed or not seeking score -inf
+        size = other.size
+        cities, states = side.cities[rows, None], side.states[rows, None]
+        scores = side.genres[rows] @ other.genres[:size].T
+        scores += CITY_WEIGHT * ((cities == other.cities[None, :size]) & (cities >= 0))
+        scores += STATE_WEIGHT * ((states == other.states[None, :size]) & (states >= 0))
+        scores[:, ~other.open[:size]] = -np.inf
+        return scores
+
+#the current application's index, updated by the create/edit/delete views
+match_index = LocalProxy(lambda: current_app.extensions['matching'])
+
+
+def page_matches(kind, id):
+    #the recommendations of the current request's detail page, scored once
+    #whether the validator or the view asks first
+    if 'matches' not in g:
+        g.matches = match_index.matches(kind, [id], current_app.config['MATCH_LIMIT'])[0]
+    return g.matches
+
+
+#what a recommendation tile shows
+TILE_FIELDS = ('id', 'name', 'image_link', 'city', 'state', 'genres')
+
+
+def stamped(validator, matches):
+    # a detail page's conditional GET validator, with the recommendations it
+    # shows as their tiles display them: which ones and their details both
+    # change without the page's rows (update() refreshes the details)
+    if validator is None:
+        return None
+    values, last_modified = validator
+    tiles = tuple(
+        tuple(tuple(match[field]) if field == 'genres' else match[field] for field in TILE_FIELDS)
+        for match in matches
+    )
+    return (values, tiles), last_modified
+
+
+def init_app(app):
+    #genres and locations of every venue and artist, kept in memory for matching
+    from models import db, Venue, Artist
+
+    app.config.setdefault('MATCH_LIMIT', 6)
+
+    columns = ('id', 'name', 'image_link', 'city', 'state', 'genres')
+    index = app.extensions['matching'] = MatchIndex(
+        loaders={
+            'venue': lambda: db.session.query(*[getattr(Venue, c) for c in columns], Venue.seeking_talent),
+            'artist': lambda: db.session.query(*[getattr(Artist, c) for c in columns], Artist.seeking_venue),
+        },
+        seeking={'venue': 'seeking_talent', 'artist': 'seeking_venue'}
+    )
+
+    @app.before_first_request
+    def load_match_index():
+        #unless a server loaded it at startup (asgi.py)
+        if not index._loaded:
+            index.load()
@@ -0,0 +1,66 @@
+"""bump per-table sequences instead of change stamp rows
+
+Revision ID: 0b6e4d2f8a17
+Revises: f2b8d6a3c914
+Create Date: 2021-08-06 09:12:44.730215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6e4d2f8a17'
+down_revision = 'f2b8d6a3c914'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venues', 'artists', 'shows')
+
+# the trigger used to UPDATE one change_stamps row per table, which every
+# writer of the table then held until its commit: writers queued on it, and
+# it deadlocked with transactions locking venues / artists rows in the other
+# order.  nextval() takes no row lock and is never rolled back
+BUMP_SEQUENCE = """
+    CREATE OR REPLACE FUNCTION bump_change_stamp() RETURNS trigger AS $$
+    BEGIN
+        PERFORM nextval(TG_TABLE_NAME || '_change_seq');
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+UPDATE_ROW = """
+    CREATE OR REPLACE FUNCTION bump_change_stamp() RETURNS trigger AS $$
+    BEGIN
+        UPDATE change_stamps
+        SET version = version + 1, changed_at = timezone('utc', clock_timestamp())
+        WHERE table_name = TG_TABLE_NAME;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade():
+    for table in TABLES:
+        op.execute('CREATE SEQUENCE IF NOT EXISTS {}_change_seq'.format(table))
+    # the statement-level triggers keep calling the same function
+    op.execute(BUMP_SEQUENCE)
+    op.drop_table('change_stamps')
+
+
+def downgrade():
+    op.create_table('change_stamps',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    op.execute(
+        "INSERT INTO change_stamps (table_name, version, changed_at) VALUES "
+        + ", ".join("('{}', 0, timezone('utc', now()))".format(table) for table in TABLES)
+    )
+    op.execute(UPDATE_ROW)
+    for table in TABLES:
+        op.execute('DROP SEQUENCE IF EXISTS {}_change_seq'.format(table))
@@ -0,0 +1,73 @@
+"""add full-text and trigram search indexes
+
+Revision ID: 3f9a2c7b1e54
+Revises: d5fee826c029
+Create Date: 2021-07-20 18:12:44.106352
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a2c7b1e54'
+down_revision = 'd5fee826c029'
+branch_labels = None
+depends_on = None
+
+
+# search_vector is kept up to date by a trigger so every write path
+# (forms, imports, raw SQL) is covered
+VENUE_SEARCH_VECTOR = """
+    setweight(to_tsvector('simple', coalesce({row}name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}city, '') || ' ' || coalesce({row}state, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(array_to_string({row}genres, ' '), '')), 'C')
+"""
+
+ARTIST_SEARCH_VECTOR = """
+    setweight(to_tsvector('simple', coalesce({row}name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}city, '') || ' ' || coalesce({row}state, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce({row}genres, '')), 'C')
+"""
+
+
+def create_search_trigger(table, vector):
+    op.execute("""
+        CREATE OR REPLACE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {vector};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """.format(table=table, vector=vector.format(row='NEW.')))
+    op.execute("""
+        CREATE TRIGGER {table}_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF name, city, state, genres ON {table}
+        FOR EACH ROW EXECUTE PROCEDURE {table}_search_vector_update()
+    """.format(table=table))
+    op.execute("UPDATE {table} SET search_vector = {vector}".format(table=table, vector=vector.format(row='')))
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    op.add_column('venues', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.add_column('artists', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    create_search_trigger('venues', VENUE_SEARCH_VECTOR)
+    create_search_trigger('artists', ARTIST_SEARCH_VECTOR)
+
+    for table in ('venues', 'artists'):
+        op.create_index('ix_{}_search_vector'.format(table), table, ['search_vector'], unique=False, postgresql_using='gin')
+        op.create_index('ix_{}_name_trgm'.format(table), table, ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+        op.create_index('ix_{}_city_trgm'.format(table), table, ['city'], unique=False, postgresql_using='gin', postgresql_ops={'city': 'gin_trgm_ops'})
+
+
+def downgrade():
+    for table in ('venues', 'artists'):
+        op.drop_index('ix_{}_city_trgm'.format(table), table_name=table)
+        op.drop_index('ix_{}_name_trgm'.format(table), table_name=table)
+        op.drop_index('ix_{}_search_vector'.format(table), table_name=table)
+        op.execute('DROP TRIGGER IF EXISTS {0}_search_vector_trigger ON {0}'.format(table))
+        op.execute('DROP FUNCTION IF EXISTS {}_search_vector_update()'.format(table))
+        op.drop_column(table, 'search_vector')
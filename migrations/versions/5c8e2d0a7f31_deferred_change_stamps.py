@@ -0,0 +1,106 @@
+"""bump change stamp rows at commit, from deferred constraint triggers
+
+Revision ID: 5c8e2d0a7f31
+Revises: 0b6e4d2f8a17
+Create Date: 2021-08-09 10:03:51.284907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8e2d0a7f31'
+down_revision = '0b6e4d2f8a17'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venues', 'artists', 'shows')
+
+# the sequences of 0b6e4d2f8a17 are not transactional: a GET between a
+# writer's INSERT and its COMMIT read the new value with the old rows, and
+# that page was then revalidated as current until the table's next write.
+# the stamps are rows again, bumped in the writer's transaction, but from a
+# deferred constraint trigger: it fires at commit, so the stamp row is only
+# locked for the commit itself and not while the writer works.
+#
+# constraint triggers are row-level, the settings of the transaction
+# (set_config(..., true)) keep it to one bump per table.  the first bump
+# locks every stamp row in table_name order, so two transactions
+# committing writes to several tables cannot deadlock on them
+BUMP_ROW = """
+    CREATE OR REPLACE FUNCTION bump_change_stamp() RETURNS trigger AS $$
+    BEGIN
+        IF coalesce(current_setting('change_stamps.' || TG_TABLE_NAME, true), '') = '' THEN
+            IF coalesce(current_setting('change_stamps.locked', true), '') = '' THEN
+                PERFORM 1 FROM change_stamps ORDER BY table_name FOR UPDATE;
+                PERFORM set_config('change_stamps.locked', 'on', true);
+            END IF;
+            UPDATE change_stamps
+            SET version = version + 1, changed_at = timezone('utc', clock_timestamp())
+            WHERE table_name = TG_TABLE_NAME;
+            PERFORM set_config('change_stamps.' || TG_TABLE_NAME, 'on', true);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+BUMP_SEQUENCE = """
+    CREATE OR REPLACE FUNCTION bump_change_stamp() RETURNS trigger AS $$
+    BEGIN
+        PERFORM nextval(TG_TABLE_NAME || '_change_seq');
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade():
+    op.create_table('change_stamps',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    # the stamps carry on from the sequences, so ETags already handed out
+    # keep meaning the same rows
+    op.execute(
+        "INSERT INTO change_stamps (table_name, version, changed_at) "
+        + " UNION ALL ".join(
+            "SELECT '{0}', last_value, timezone('utc', now()) FROM {0}_change_seq".format(table)
+            for table in TABLES
+        )
+    )
+    op.execute(BUMP_ROW)
+    for table in TABLES:
+        op.execute('DROP TRIGGER IF EXISTS {0}_change_stamp_trigger ON {0}'.format(table))
+        op.execute("""
+            CREATE CONSTRAINT TRIGGER {0}_change_stamp_trigger
+            AFTER INSERT OR UPDATE OR DELETE ON {0}
+            DEFERRABLE INITIALLY DEFERRED
+            FOR EACH ROW EXECUTE PROCEDURE bump_change_stamp()
+        """.format(table))
+        # constraint triggers cannot fire on TRUNCATE, which is rare enough
+        # to bump (and lock) the stamp at once
+        op.execute("""
+            CREATE TRIGGER {0}_truncate_change_stamp_trigger
+            AFTER TRUNCATE ON {0}
+            FOR EACH STATEMENT EXECUTE PROCEDURE bump_change_stamp()
+        """.format(table))
+        op.execute('DROP SEQUENCE IF EXISTS {}_change_seq'.format(table))
+
+
+def downgrade():
+    for table in TABLES:
+        op.execute('CREATE SEQUENCE IF NOT EXISTS {}_change_seq'.format(table))
+        op.execute("SELECT setval('{0}_change_seq', greatest(version, 1)) FROM change_stamps WHERE table_name = '{0}'".format(table))
+        op.execute('DROP TRIGGER IF EXISTS {0}_truncate_change_stamp_trigger ON {0}'.format(table))
+        op.execute('DROP TRIGGER IF EXISTS {0}_change_stamp_trigger ON {0}'.format(table))
+        op.execute("""
+            CREATE TRIGGER {0}_change_stamp_trigger
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {0}
+            FOR EACH STATEMENT EXECUTE PROCEDURE bump_change_stamp()
+        """.format(table))
+    op.execute(BUMP_SEQUENCE)
+    op.drop_table('change_stamps')
@@ -0,0 +1,61 @@
+"""add updated_at columns and table change stamps
+
+Revision ID: 7c1d5e2a9b30
+Revises: 3f9a2c7b1e54
+Create Date: 2021-07-22 11:40:05.517290
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1d5e2a9b30'
+down_revision = '3f9a2c7b1e54'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venues', 'artists', 'shows')
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")))
+
+    op.create_table('change_stamps',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    op.execute(
+        "INSERT INTO change_stamps (table_name, version, changed_at) VALUES "
+        + ", ".join("('{}', 0, timezone('utc', now()))".format(table) for table in TABLES)
+    )
+
+    # statement-level, so a bulk load or a cascade bumps the stamp once
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_change_stamp() RETURNS trigger AS $$
+        BEGIN
+            UPDATE change_stamps
+            SET version = version + 1, changed_at = timezone('utc', clock_timestamp())
+            WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in TABLES:
+        op.execute("""
+            CREATE TRIGGER {0}_change_stamp_trigger
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {0}
+            FOR EACH STATEMENT EXECUTE PROCEDURE bump_change_stamp()
+        """.format(table))
+
+
+def downgrade():
+    for table in TABLES:
+        op.execute('DROP TRIGGER IF EXISTS {0}_change_stamp_trigger ON {0}'.format(table))
+    op.execute('DROP FUNCTION IF EXISTS bump_change_stamp()')
+    op.drop_table('change_stamps')
+    for table in TABLES:
+        op.drop_column(table, 'updated_at')
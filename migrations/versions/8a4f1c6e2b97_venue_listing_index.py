@@ -0,0 +1,31 @@
+"""require venue states, index the venues listing order
+
+Revision ID: 8a4f1c6e2b97
+Revises: 5c8e2d0a7f31
+Create Date: 2021-08-10 16:47:12.609483
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4f1c6e2b97'
+down_revision = '5c8e2d0a7f31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the listing seeks on (state, city, id): a NULL state never compares
+    # past a cursor, so those venues could not be reached
+    op.execute("UPDATE venues SET state = '' WHERE state IS NULL")
+    op.alter_column('venues', 'state', existing_type=sa.String(length=150), nullable=False)
+    with op.get_context().autocommit_block():
+        op.create_index('ix_venues_state_city_id', 'venues', ['state', 'city', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_venues_state_city_id', table_name='venues', postgresql_concurrently=True)
+    op.alter_column('venues', 'state', existing_type=sa.String(length=150), nullable=True)
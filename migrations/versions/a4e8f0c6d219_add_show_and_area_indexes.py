@@ -0,0 +1,36 @@
+"""add show and venue area indexes
+
+Revision ID: a4e8f0c6d219
+Revises: 7c1d5e2a9b30
+Create Date: 2021-07-26 09:03:51.884120
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4e8f0c6d219'
+down_revision = '7c1d5e2a9b30'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time']),
+    ('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time']),
+    ('ix_shows_start_time', 'shows', ['start_time', 'id']),
+    ('ix_venues_city_state', 'venues', ['city', 'state']),
+]
+
+
+def upgrade():
+    # CONCURRENTLY keeps the tables writable while the indexes build, and it
+    # cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,51 @@
+"""add upcoming/past show counters to venues and artists
+
+Revision ID: b2f7d3c81e4a
+Revises: a4e8f0c6d219
+Create Date: 2021-07-28 10:12:37.405118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2f7d3c81e4a'
+down_revision = 'a4e8f0c6d219'
+branch_labels = None
+depends_on = None
+
+COUNTED = (('venues', 'venue_id'), ('artists', 'artist_id'))
+
+
+def upgrade():
+    op.add_column('shows', sa.Column('counted_past', sa.Boolean(), nullable=False, server_default=sa.false()))
+    for table, _ in COUNTED:
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # start times are stored in local time, compare them with LOCALTIMESTAMP
+    op.execute('UPDATE shows SET counted_past = true WHERE start_time < LOCALTIMESTAMP')
+    for table, key in COUNTED:
+        op.execute("""
+            UPDATE {0}
+            SET upcoming_shows_count = counts.upcoming, past_shows_count = counts.past
+            FROM (
+                SELECT {1} AS id,
+                       count(*) FILTER (WHERE NOT counted_past) AS upcoming,
+                       count(*) FILTER (WHERE counted_past) AS past
+                FROM shows
+                GROUP BY {1}
+            ) AS counts
+            WHERE {0}.id = counts.id
+        """.format(table, key))
+
+    op.create_index('ix_shows_not_counted_past', 'shows', ['start_time'], unique=False, postgresql_where=sa.text('NOT counted_past'))
+
+
+def downgrade():
+    op.drop_index('ix_shows_not_counted_past', table_name='shows')
+    for table, _ in reversed(COUNTED):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
+    op.drop_column('shows', 'counted_past')
@@ -0,0 +1,76 @@
+"""store artist genres as an array and GIN-index genres
+
+Revision ID: c83a1f5e27d6
+Revises: b2f7d3c81e4a
+Create Date: 2021-07-30 14:25:09.731552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c83a1f5e27d6'
+down_revision = 'b2f7d3c81e4a'
+branch_labels = None
+depends_on = None
+
+ARTIST_SEARCH_VECTOR = """
+    setweight(to_tsvector('simple', coalesce({row}name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}city, '') || ' ' || coalesce({row}state, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce({genres}, '')), 'C')
+"""
+
+
+def replace_search_trigger(genres):
+    # a trigger firing on UPDATE OF genres pins the column type, so it is
+    # dropped around the type change and recreated with the matching vector
+    op.execute("""
+        CREATE OR REPLACE FUNCTION artists_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {vector};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """.format(vector=ARTIST_SEARCH_VECTOR.format(row='NEW.', genres=genres.format(row='NEW.'))))
+    op.execute("""
+        CREATE TRIGGER artists_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF name, city, state, genres ON artists
+        FOR EACH ROW EXECUTE PROCEDURE artists_search_vector_update()
+    """)
+    op.execute("UPDATE artists SET search_vector = {}".format(ARTIST_SEARCH_VECTOR.format(row='', genres=genres.format(row=''))))
+
+
+def upgrade():
+    op.execute('DROP TRIGGER IF EXISTS artists_search_vector_trigger ON artists')
+    # rows written by the form hold an array literal ('{Jazz,"Rock n Roll"}'),
+    # anything else is taken as a comma separated list
+    op.alter_column('artists', 'genres',
+        existing_type=sa.String(length=120),
+        type_=postgresql.ARRAY(sa.String()),
+        nullable=False,
+        postgresql_using="""
+            CASE
+                WHEN genres IS NULL OR genres = '' THEN '{}'::varchar[]
+                WHEN left(genres, 1) = '{' THEN genres::varchar[]
+                ELSE array_remove(string_to_array(regexp_replace(genres, '\\s*,\\s*', ',', 'g'), ','), '')::varchar[]
+            END
+        """)
+    replace_search_trigger("array_to_string({row}genres, ' ')")
+
+    op.create_index('ix_venues_genres', 'venues', ['genres'], unique=False, postgresql_using='gin')
+    op.create_index('ix_artists_genres', 'artists', ['genres'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_artists_genres', table_name='artists')
+    op.drop_index('ix_venues_genres', table_name='venues')
+
+    op.execute('DROP TRIGGER IF EXISTS artists_search_vector_trigger ON artists')
+    op.alter_column('artists', 'genres',
+        existing_type=postgresql.ARRAY(sa.String()),
+        type_=sa.String(length=120),
+        nullable=True,
+        postgresql_using='genres::varchar(120)')
+    replace_search_trigger('{row}genres')
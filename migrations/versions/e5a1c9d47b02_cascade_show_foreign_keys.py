@@ -0,0 +1,44 @@
+"""delete shows with their venue or artist in the database
+
+Revision ID: e5a1c9d47b02
+Revises: c83a1f5e27d6
+Create Date: 2021-08-02 10:41:27.306118
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a1c9d47b02'
+down_revision = 'c83a1f5e27d6'
+branch_labels = None
+depends_on = None
+
+# the shows table was created with plain foreign keys (ec74040ff677), so the
+# ondelete='CASCADE' declared on the model never reached the database
+FOREIGN_KEYS = [
+    ('shows_artist_id_fkey', 'artist_id', 'artists'),
+    ('shows_venue_id_fkey', 'venue_id', 'venues'),
+]
+
+
+def replace_foreign_keys(on_delete):
+    # NOT VALID swaps the constraint without scanning shows under the
+    # ALTER's exclusive lock; VALIDATE then checks the existing rows while
+    # the table stays writable
+    for name, column, table in FOREIGN_KEYS:
+        op.execute("""
+            ALTER TABLE shows
+                DROP CONSTRAINT IF EXISTS {name},
+                ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {table} (id) {on_delete} NOT VALID
+        """.format(name=name, column=column, table=table, on_delete=on_delete))
+    for name, _, _ in FOREIGN_KEYS:
+        op.execute('ALTER TABLE shows VALIDATE CONSTRAINT {}'.format(name))
+
+
+def upgrade():
+    replace_foreign_keys('ON DELETE CASCADE')
+
+
+def downgrade():
+    replace_foreign_keys('')
@@ -0,0 +1,47 @@
+"""add show duration, booked period and its gist indexes
+
+Revision ID: f2b8d6a3c914
+Revises: e5a1c9d47b02
+Create Date: 2021-08-04 14:22:09.518342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d6a3c914'
+down_revision = 'e5a1c9d47b02'
+branch_labels = None
+depends_on = None
+
+PERIOD = "tsrange(start_time, start_time + duration * interval '1 minute')"
+
+# btree_gist lets the integer id share a gist index with the range
+INDEXES = [
+    ('ix_shows_venue_id_period', ['venue_id', 'period']),
+    ('ix_shows_artist_id_period', ['artist_id', 'period']),
+]
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    # a constant default is only recorded in the catalog, but the stored
+    # generated column is computed for every existing show: the table is
+    # rewritten under the ALTER's exclusive lock
+    op.add_column('shows', sa.Column('duration', sa.Integer(), server_default='120', nullable=False))
+    op.add_column('shows', sa.Column('period', postgresql.TSRANGE(), sa.Computed(PERIOD, persisted=True), nullable=True))
+    # plain indexes rather than exclusion constraints: shows imported or
+    # seeded before this revision may already overlap
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, 'shows', columns, unique=False, postgresql_using='gist', postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='shows', postgresql_concurrently=True)
+    op.drop_column('shows', 'period')
+    op.drop_column('shows', 'duration')
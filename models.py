@@ -1,4 +1,36 @@
-from app import db
+from datetime import datetime
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import TSRANGE, TSVECTOR
+
+#bound to the application by create_app() in app.py
+db = SQLAlchemy()
+
+#length of a show booked without one, in minutes
+DEFAULT_SHOW_DURATION = 120
+
+#canonical genre list, shared by the forms, the listing filters and the facets;
+#kept here so the query layer does not load WTForms
+GENRE_CHOICES = [
+    ('Alternative', 'Alternative'),
+    ('Blues', 'Blues'),
+    ('Classical', 'Classical'),
+    ('Country', 'Country'),
+    ('Electronic', 'Electronic'),
+    ('Folk', 'Folk'),
+    ('Funk', 'Funk'),
+    ('Hip-Hop', 'Hip-Hop'),
+    ('Heavy Metal', 'Heavy Metal'),
+    ('Instrumental', 'Instrumental'),
+    ('Jazz', 'Jazz'),
+    ('Musical Theatre', 'Musical Theatre'),
+    ('Pop', 'Pop'),
+    ('Punk', 'Punk'),
+    ('R&B', 'R&B'),
+    ('Reggae', 'Reggae'),
+    ('Rock n Roll', 'Rock n Roll'),
+    ('Soul', 'Soul'),
+    ('Other', 'Other'),
+]
 
 class Venue(db.Model):
     __tablename__ = 'venues'
@@ -6,7 +38,8 @@ class Venue(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(150), nullable=False)
-    state = db.Column(db.String(150), nullable=True)
+    #required: the venues listing is keyset-paginated on (state, city, id)
+    state = db.Column(db.String(150), nullable=False)
     address = db.Column(db.String(150), nullable=False)
     phone = db.Column(db.String(150))
     image_link = db.Column(db.String(500), nullable=False)
@@ -15,7 +48,23 @@ class Venue(db.Model):
     website_link = db.Column(db.String(200))
     seeking_talent = db.Column(db.Boolean, default=True)
     seeking_description = db.Column(db.String(300))
-    shows = db.relationship('Show', backref='venue', lazy=True, cascade="all, delete")
+    #shows are deleted by the database (ON DELETE CASCADE), never loaded for it
+    shows = db.relationship('Show', backref='venue', lazy=True, cascade="all, delete", passive_deletes=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    #maintained by counters.py together with the shows they count
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    #maintained by a database trigger from name, city, state and genres
+    search_vector = db.Column(TSVECTOR)
+
+    __table_args__ = (
+        db.Index('ix_venues_search_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('ix_venues_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_venues_city_trgm', 'city', postgresql_using='gin', postgresql_ops={'city': 'gin_trgm_ops'}),
+        db.Index('ix_venues_city_state', 'city', 'state'),
+        db.Index('ix_venues_state_city_id', 'state', 'city', 'id'),
+        db.Index('ix_venues_genres', 'genres', postgresql_using='gin'),
+    )
 
     def __repr__(self):
       return f"<Venue {self.id} name: {self.name}>"
@@ -30,12 +79,26 @@ class Artist(db.Model):
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=True)
     phone = db.Column(db.String(120), nullable=False)
-    genres = db.Column(db.String(120))
+    genres = db.Column(db.ARRAY(db.String()), nullable=False)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean, default=True)
     seeking_description=db.Column(db.String(300))
-    shows = db.relationship('Show', backref='artist', lazy=True, cascade="all, delete")
+    #shows are deleted by the database (ON DELETE CASCADE), never loaded for it
+    shows = db.relationship('Show', backref='artist', lazy=True, cascade="all, delete", passive_deletes=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    #maintained by counters.py together with the shows they count
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    #maintained by a database trigger from name, city, state and genres
+    search_vector = db.Column(TSVECTOR)
+
+    __table_args__ = (
+        db.Index('ix_artists_search_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('ix_artists_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_artists_city_trgm', 'city', postgresql_using='gin', postgresql_ops={'city': 'gin_trgm_ops'}),
+        db.Index('ix_artists_genres', 'genres', postgresql_using='gin'),
+    )
     
     def __repr__(self):
       return f"<Artis {self.id} name: {self.name}>"
@@ -47,6 +110,38 @@ class Show(db.Model):
     artist_id = db.Column(db.Integer, db.ForeignKey('artists.id', ondelete='CASCADE'), nullable=False)
     venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
+    #minutes the show holds its venue and artist for; `period` is the booked
+    #[start_time, start_time + duration) range, kept by the database
+    duration = db.Column(db.Integer, nullable=False, default=DEFAULT_SHOW_DURATION, server_default=str(DEFAULT_SHOW_DURATION))
+    period = db.Column(TSRANGE, db.Computed("tsrange(start_time, start_time + duration * interval '1 minute')"))
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    #which counter of its venue and artist the show is in, see counters.py
+    counted_past = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
+    __table_args__ = (
+        #detail pages and cascades (per venue / per artist, by time)
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+        #shows listing, keyset-paginated on (start_time, id)
+        db.Index('ix_shows_start_time', 'start_time', 'id'),
+        #shows still counted as upcoming, for the counter roll-over
+        db.Index('ix_shows_not_counted_past', 'start_time', postgresql_where=db.text('NOT counted_past')),
+        #overlapping bookings of a venue / an artist, see scheduling.py
+        db.Index('ix_shows_venue_id_period', 'venue_id', 'period', postgresql_using='gist'),
+        db.Index('ix_shows_artist_id_period', 'artist_id', 'period', postgresql_using='gist'),
+    )
 
     def __repr__(self):
       return f"<Show {self.id}, Artist {self.artist_id}, Venue {self.venue_id}>"
+
+class ChangeStamp(db.Model):
+    #one row per table, bumped once per writing transaction, at its commit,
+    #by a deferred constraint trigger (cascades included)
+    __tablename__ = 'change_stamps'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+      return f"<ChangeStamp {self.table_name} version: {self.version}>"
@@ -0,0 +1,514 @@
+#----------------------------------------------------------------------------#
+# Query layer shared by the HTML views.
+#----------------------------------------------------------------------------#
+
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import DateTime, cast, func, literal, select, tuple_, union_all
+from sqlalchemy.dialects.postgresql import array
+
+from models import GENRE_CHOICES, db, Venue, Artist, Show, ChangeStamp
+
+
+#------------------------------KEYSET PAGINATION--------------------------
+# a page of rows plus opaque cursors pointing at its first and last row,
+# None when there is nothing further in that direction
+Page = namedtuple('Page', ['items', 'next_cursor', 'prev_cursor'])
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, keys):
+    #a malformed cursor simply falls back to the first page
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            return None
+        decoded = []
+        for key, v in zip(keys, values):
+            if isinstance(key.type, DateTime):
+                v = datetime.fromisoformat(v)
+            #each value must have its key's type, or the seek fails in the database
+            elif type(v) is not key.type.python_type:
+                return None
+            decoded.append(v)
+        return decoded
+    except (ValueError, TypeError, NotImplementedError):
+        return None
+
+
+def page_args(args):
+    #cursor and page size of a listing request, the size is capped by MAX_PAGE_SIZE
+    limit = args.get('limit', current_app.config['PAGE_SIZE'], type=int)
+    return {
+        "after": args.get('after'),
+        "before": args.get('before'),
+        "limit": max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+    }
+
+
+def keyset(stmt, keys, after=None, before=None, limit=50):
+    #keyset pagination: seek past the cursor on the (indexed) sort keys
+    #instead of OFFSET, so every page costs the same however deep it is.
+    #one extra row tells whether there is another page
+    if before is not None:
+        stmt = stmt.where(tuple_(*keys) < tuple_(*before)).order_by(*[key.desc() for key in keys])
+    else:
+        if after is not None:
+            stmt = stmt.where(tuple_(*keys) > tuple_(*after))
+        stmt = stmt.order_by(*keys)
+    return stmt.limit(limit + 1)
+
+
+def page_cursors(keys, after=None, before=None):
+    #decoded (after, before) cursors of a request, after wins over before
+    after = decode_cursor(after, keys)
+    before = decode_cursor(before, keys) if after is None else None
+    return after, before
+
+
+def page_of(rows, keys, after, before, limit):
+    #a Page from the rows of keyset(stmt, keys, after, before, limit)
+    rows = list(rows)
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    if before is not None:
+        rows.reverse()
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = after is not None, more
+
+    def cursor(row):
+        return encode_cursor([row._mapping[key] for key in keys])
+
+    return Page(
+        items=rows,
+        next_cursor=cursor(rows[-1]) if rows and has_next else None,
+        prev_cursor=cursor(rows[0]) if rows and has_prev else None
+    )
+
+
+def paginate(stmt, keys, after=None, before=None, limit=50):
+    after, before = page_cursors(keys, after, before)
+    rows = db.session.execute(keyset(stmt, keys, after, before, limit))
+    return page_of(rows, keys, after, before, limit)
+
+
+#rows fetched per round trip by a streamed page's server-side cursor
+STREAM_YIELD_PER = 50
+
+
+class PageStream:
+    # a Page whose items are shaped one at a time as a streamed template
+    # iterates over them, straight from a server-side cursor; next_cursor
+    # and prev_cursor are filled in as the rows go by, so they are only
+    # final once the items have been consumed (a pager after the list)
+    def __init__(self, rows, keys, after, limit, shape):
+        self.next_cursor = None
+        self.prev_cursor = None
+        self.items = self._stream(rows, keys, after, limit, shape)
+
+    def _stream(self, rows, keys, after, limit, shape):
+        def cursor(row):
+            return encode_cursor([row._mapping[key] for key in keys])
+
+        last = None
+        try:
+            for row in rows:
+                if last is None and after is not None:
+                    self.prev_cursor = cursor(row)
+                #the extra row of keyset() only says there is another page
+                if last is not None and limit == 0:
+                    self.next_cursor = cursor(last)
+                    return
+                limit -= 1
+                last = row
+                yield shape(row)
+        finally:
+            rows.close()
+
+
+def stream_page(stmt, keys, shape, after=None, before=None, limit=50):
+    # paginate() for streamed templates: the statement runs now (inside the
+    # view, so errors and query counts belong to the request), its rows are
+    # read while the page renders
+    after, before = page_cursors(keys, after, before)
+    stmt = keyset(stmt, keys, after, before, limit)
+    if before is not None:
+        #a page before the cursor arrives in reverse, at most `limit` rows are flipped in memory
+        page = page_of(db.session.execute(stmt), keys, after, before, limit)
+        return page._replace(items=[shape(row) for row in page.items])
+    rows = db.session.execute(stmt.execution_options(stream_results=True)).yield_per(STREAM_YIELD_PER)
+    return PageStream(rows, keys, after, limit, shape)
+
+
+#------------------------------GENRES--------------------------
+def has_genre(model, genre):
+    #genres @> ARRAY[genre], cast to the column's varchar[] so the GIN index applies
+    return model.genres.op('@>')(cast(array([genre]), model.genres.type))
+
+
+def genre_facets():
+    #number of venues and artists per genre, in one aggregate over both tables;
+    #canonical genres come first in form order, zero counts included
+    genres = union_all(
+        select(func.unnest(Venue.genres).label('genre'), literal('venues').label('kind')),
+        select(func.unnest(Artist.genres).label('genre'), literal('artists').label('kind'))
+    ).subquery()
+    rows = db.session.execute(
+        select(
+            genres.c.genre,
+            func.count().filter(genres.c.kind == 'venues').label('venues'),
+            func.count().filter(genres.c.kind == 'artists').label('artists')
+        )
+        .group_by(genres.c.genre)
+        .order_by(genres.c.genre)
+    )
+    counts = {row.genre: {"genre": row.genre, "venues": row.venues, "artists": row.artists} for row in rows}
+    facets = [counts.pop(genre, {"genre": genre, "venues": 0, "artists": 0}) for genre, _ in GENRE_CHOICES]
+    return facets + list(counts.values())
+
+
+#------------------------------VENUES LISTING--------------------------
+#statement builders and row shapers are separate so asgi.py can run the
+#same statements on its async engine.  venues are listed by area, so a
+#page holds whole runs of one (city, state) for group_areas().  the order is
+#ix_venues_state_city_id's, and venues.state is NOT NULL: a NULL would never
+#compare past a cursor
+VENUE_KEYS = [Venue.state, Venue.city, Venue.id]
+
+
+def venues_query(city=None, state=None, genre=None):
+    # every venue with its number of upcoming shows, read from the counter
+    # column (see counters.py) so no show row is touched
+    stmt = select(
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        Venue.upcoming_shows_count.label('num_upcoming_shows'),
+        Venue.updated_at
+    )
+    #a single area is looked up on the (city, state) index
+    if city is not None and state is not None:
+        stmt = stmt.where(Venue.city == city, Venue.state == state)
+    if genre:
+        stmt = stmt.where(has_genre(Venue, genre))
+    return stmt
+
+
+def venue_items(page):
+    return page._replace(items=[dict(row._mapping) for row in page.items])
+
+
+def venues_page(after=None, before=None, limit=50, city=None, state=None, genre=None):
+    return venue_items(paginate(venues_query(city, state, genre), VENUE_KEYS, after, before, limit))
+
+
+def venue_areas(after=None, before=None, limit=50, city=None, state=None, genre=None):
+    return group_areas(venues_page(after, before, limit, city, state, genre))
+
+
+def group_areas(page):
+    #group venues that have the same city and state in a single pass
+    areas = {}
+    for venue in page.items:
+        area = areas.get((venue['city'], venue['state']))
+        if area is None:
+            area = areas[(venue['city'], venue['state'])] = {
+                "city": venue['city'],
+                "state": venue['state'],
+                "venues": []
+            }
+        area['venues'].append({
+            "id": venue['id'],
+            "name": venue['name'],
+            "num_upcoming_shows": venue['num_upcoming_shows'],
+            "updated_at": venue['updated_at']
+        })
+
+    return page._replace(items=list(areas.values()))
+
+
+#------------------------------ARTISTS LISTING--------------------------
+ARTIST_KEYS = [Artist.id]
+
+
+def artists_query(genre=None):
+    stmt = select(Artist.id, Artist.name, Artist.updated_at)
+    if genre:
+        stmt = stmt.where(has_genre(Artist, genre))
+    return stmt
+
+
+def artist_item(row):
+    return {"id": row.id, "name": row.name, "updated_at": row.updated_at}
+
+
+def artist_items(page):
+    return page._replace(items=[artist_item(row) for row in page.items])
+
+
+def artists_page(after=None, before=None, limit=50, genre=None):
+    return artist_items(paginate(artists_query(genre), ARTIST_KEYS, after, before, limit))
+
+
+def artists_stream(after=None, before=None, limit=50, genre=None):
+    return stream_page(artists_query(genre), ARTIST_KEYS, artist_item, after, before, limit)
+
+
+#------------------------------SHOWS LISTING--------------------------
+SHOW_KEYS = [Show.start_time, Show.id]
+
+
+def shows_query():
+    #project only the columns the listing needs, paged on (start_time, id)
+    return (
+        select(
+            Show.id,
+            Show.start_time,
+            Show.venue_id,
+            Venue.name.label('venue_name'),
+            Show.artist_id,
+            Artist.name.label('artist_name'),
+            Artist.image_link.label('artist_image_link'),
+            #version of the tile: it changes with any of the three rows it shows
+            func.greatest(Show.updated_at, Artist.updated_at, Venue.updated_at).label('updated_at')
+        )
+        .join(Artist, Show.artist_id == Artist.id)
+        .join(Venue, Show.venue_id == Venue.id)
+    )
+
+
+def show_item(row):
+    return {
+        "id": row.id,
+        "venue_id": row.venue_id,
+        "venue_name": row.venue_name,
+        "artist_id": row.artist_id,
+        "artist_name": row.artist_name,
+        "artist_image_link": row.artist_image_link,
+        "start_time": row.start_time,
+        "updated_at": row.updated_at
+    }
+
+
+def show_items(page):
+    return page._replace(items=[show_item(row) for row in page.items])
+
+
+def shows_page(after=None, before=None, limit=50):
+    return show_items(paginate(shows_query(), SHOW_KEYS, after, before, limit))
+
+
+def shows_stream(after=None, before=None, limit=50):
+    return stream_page(shows_query(), SHOW_KEYS, show_item, after, before, limit)
+
+
+#------------------------------DETAIL PAGES--------------------------
+def _partition_shows(rows):
+    #single pass over shows ordered by start time, split on the counter a
+    #show is in so the lists always agree with the counts next to them
+    past_shows = []
+    upcoming_shows = []
+    for row in rows:
+        show = dict(row._mapping)
+        (past_shows if show.pop('counted_past') else upcoming_shows).append(show)
+    return past_shows, upcoming_shows
+
+
+def venue_shows_query(venue_id):
+    #one JOIN query projecting only what the show tiles display,
+    #so no artist row is lazy-loaded per show
+    return (
+        select(
+            Show.artist_id,
+            Artist.name.label('artist_name'),
+            Artist.image_link.label('artist_image_link'),
+            Show.start_time,
+            Show.counted_past
+        )
+        .join(Artist, Show.artist_id == Artist.id)
+        .where(Show.venue_id == venue_id)
+        .order_by(Show.start_time)
+    )
+
+
+def artist_shows_query(artist_id):
+    return (
+        select(
+            Show.venue_id,
+            Venue.name.label('venue_name'),
+            Venue.image_link.label('venue_image_link'),
+            Show.start_time,
+            Show.counted_past
+        )
+        .join(Venue, Show.venue_id == Venue.id)
+        .where(Show.artist_id == artist_id)
+        .order_by(Show.start_time)
+    )
+
+
+def venue_detail(venue_id):
+    venue = Venue.query.get(venue_id)
+    if venue is None:
+        return None
+    return venue_payload(venue, db.session.execute(venue_shows_query(venue_id)))
+
+
+def venue_payload(venue, rows):
+    past_shows, upcoming_shows = _partition_shows(rows)
+    return {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": venue.genres,
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website_link": venue.website_link,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": venue.past_shows_count,
+        "upcoming_shows_count": venue.upcoming_shows_count
+    }
+
+
+def artist_detail(artist_id):
+    artist = Artist.query.get(artist_id)
+    if artist is None:
+        return None
+    return artist_payload(artist, db.session.execute(artist_shows_query(artist_id)))
+
+
+def artist_payload(artist, rows):
+    past_shows, upcoming_shows = _partition_shows(rows)
+    return {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": artist.genres,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": artist.past_shows_count,
+        "upcoming_shows_count": artist.upcoming_shows_count
+    }
+
+
+#------------------------------RELATED ENTITIES--------------------------
+#ids whose detail pages list shows of the given venue / artist
+def venue_artist_ids(venue_id):
+    return db.session.execute(select(Show.artist_id).where(Show.venue_id == venue_id).distinct()).scalars().all()
+
+
+def artist_venue_ids(artist_id):
+    return db.session.execute(select(Show.venue_id).where(Show.artist_id == artist_id).distinct()).scalars().all()
+
+
+#------------------------------CHANGE STAMPS--------------------------
+# validators for conditional GETs: (values, last_modified) where values
+# change whenever the page content can change.  shows only move from
+# upcoming to past through the counter roll-over, which writes the rows
+# involved, so row stamps are enough.  no stamp here is a time that only
+# moves forward (deleting the latest show takes the max back), so
+# last_modified is None and pages are validated by their ETag alone
+
+def listing_stamps_query(*tables):
+    # table-level stamps only, the cost does not grow with the tables.  a
+    # stamp is bumped inside the writer's transaction, at its commit, so it
+    # never moves before the rows it stands for are visible
+    return (
+        select(ChangeStamp.table_name, ChangeStamp.version)
+        .where(ChangeStamp.table_name.in_(tables))
+        .order_by(ChangeStamp.table_name)
+    )
+
+
+def listing_validator(rows):
+    #no Last-Modified, pages are validated by their ETag alone (see above)
+    return tuple((row.table_name, row.version) for row in rows), None
+
+
+def listing_stamps(*tables):
+    return listing_validator(db.session.execute(listing_stamps_query(*tables)).all())
+
+
+#tables each listing page is built from
+LISTING_TABLES = {
+    #names, areas and upcoming show counts, all columns of venues
+    'venues': ('venues',),
+    'artists': ('artists',),
+    'shows': ('shows', 'artists', 'venues'),
+}
+
+
+def venues_stamps():
+    return listing_stamps(*LISTING_TABLES['venues'])
+
+
+def artists_stamps():
+    return listing_stamps(*LISTING_TABLES['artists'])
+
+
+def shows_stamps():
+    return listing_stamps(*LISTING_TABLES['shows'])
+
+
+def _detail_stamps_query(model, id, show_key, other, other_key):
+    return (
+        select(
+            model.updated_at,
+            func.count(Show.id),
+            func.max(Show.updated_at),
+            func.max(other.updated_at)
+        )
+        .select_from(model)
+        .outerjoin(Show, show_key == model.id)
+        .outerjoin(other, other_key == other.id)
+        .where(model.id == id)
+        .group_by(model.id)
+    )
+
+
+def venue_stamps_query(venue_id):
+    #the venue row, its shows and the artists playing them
+    return _detail_stamps_query(Venue, venue_id, Show.venue_id, Artist, Show.artist_id)
+
+
+def artist_stamps_query(artist_id):
+    return _detail_stamps_query(Artist, artist_id, Show.artist_id, Venue, Show.venue_id)
+
+
+def detail_validator(row):
+    #None when the venue / artist does not exist
+    if row is None:
+        return None
+    return tuple(row), None
+
+
+def venue_stamps(venue_id):
+    return detail_validator(db.session.execute(venue_stamps_query(venue_id)).first())
+
+
+def artist_stamps(artist_id):
+    return detail_validator(db.session.execute(artist_stamps_query(artist_id)).first())
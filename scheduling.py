@@ -0,0 +1,243 @@
+#----------------------------------------------------------------------------#
+# Booking shows without double-booking a venue or an artist.
+#----------------------------------------------------------------------------#
+# A show holds its venue and its artist for [start_time, start_time +
+# duration).  schedule() checks any number of requested shows at once:
+# against the shows already booked, in one query through the gist indexes
+# on (venue_id, period) and (artist_id, period), and against each other,
+# through a Calendar of the periods accepted so far per venue and artist.
+# Every conflict is reported, and the shows without one are inserted in the
+# same transaction.
+#
+# The venue and artist rows involved are locked first (FOR UPDATE, in id
+# order, venues before artists like the counter updates), so two batches
+# touching the same venue or artist are checked one after the other and
+# cannot both book the same evening.
+#
+# availability() answers the other question, which venues of a city are
+# free when: one query returns the venues with their shows in the window,
+# sorted by (venue id, start time), and one sweep over them yields the gaps.
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from itertools import groupby
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import DateTime, Integer, and_, column, func, insert, literal, select, union_all, values
+
+import counters
+from cache import detail_cache
+from models import DEFAULT_SHOW_DURATION, db, Venue, Artist, Show
+
+#longest booking accepted, in minutes
+MAX_DURATION = 7 * 24 * 60
+
+#side of a booking -> its model and show column
+SIDES = {
+    'venue': (Venue, Show.venue_id),
+    'artist': (Artist, Show.artist_id),
+}
+
+
+class Calendar:
+    # the periods booked so far for one venue or artist.  they are sorted and
+    # never overlap, so their ends are sorted too and the ones overlapping a
+    # new period are the contiguous run found by two bisections
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.entries = []
+
+    def overlapping(self, start, end):
+        return self.entries[bisect_right(self.ends, start):bisect_left(self.starts, end)]
+
+    def add(self, start, end, entry):
+        i = bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.entries.insert(i, entry)
+
+
+def parse_entry(item):
+    # one requested show of a JSON batch -> the values to insert; raises
+    # ValueError with the reason.  start times are local, like the ones
+    # entered in the show form
+    if not isinstance(item, dict):
+        raise ValueError('expected an object')
+    entry = {}
+    for key in ('artist_id', 'venue_id'):
+        if type(item.get(key)) is not int:
+            raise ValueError('{} must be an integer'.format(key))
+        entry[key] = item[key]
+    try:
+        entry['start_time'] = datetime.fromisoformat(item.get('start_time'))
+    except (TypeError, ValueError):
+        raise ValueError('start_time must be an ISO 8601 date and time')
+    if entry['start_time'].tzinfo is not None:
+        raise ValueError('start_time must be a local time, without a UTC offset')
+    duration = item.get('duration', DEFAULT_SHOW_DURATION)
+    if type(duration) is not int or not 0 < duration <= MAX_DURATION:
+        raise ValueError('duration must be a number of minutes between 1 and {}'.format(MAX_DURATION))
+    entry['duration'] = duration
+    return entry
+
+
+def end_of(entry):
+    return entry['start_time'] + timedelta(minutes=entry['duration'])
+
+
+def lock(model, ids):
+    #locks the rows that exist and returns their ids
+    return set(db.session.execute(
+        select(model.id).where(model.id.in_(sorted(ids))).order_by(model.id).with_for_update()
+    ).scalars())
+
+
+def booked(entries):
+    # entry index -> the booked shows overlapping it, each with the side it
+    # shares; the entries are sent once, as a VALUES list, and joined to shows
+    # once per side, so every lookup is a scan of the matching gist index
+    requested = select(values(
+        column('entry', Integer), column('venue_id', Integer), column('artist_id', Integer),
+        column('starts', DateTime), column('ends', DateTime),
+        name='requested'
+    ).data([
+        (i, entry['venue_id'], entry['artist_id'], entry['start_time'], end_of(entry))
+        for i, entry in enumerate(entries)
+    ])).cte('requested')
+    period = func.tsrange(requested.c.starts, requested.c.ends)
+    stmt = union_all(*[
+        select(
+            requested.c.entry, literal(side).label('side'),
+            Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.duration
+        )
+        .select_from(requested)
+        .join(Show, and_(key == requested.c[key.key], Show.period.op('&&')(period)))
+        for side, (_, key) in SIDES.items()
+    ])
+    found = defaultdict(list)
+    for row in db.session.execute(stmt):
+        found[row.entry].append({
+            "side": row.side,
+            "show_id": row.id,
+            "venue_id": row.venue_id,
+            "artist_id": row.artist_id,
+            "start_time": row.start_time,
+            "duration": row.duration
+        })
+    return found
+
+
+def schedule(entries, now=None):
+    # books the entries (dicts from parse_entry) that do not overlap a booked
+    # show or an earlier entry of the same venue or artist, in the current
+    # transaction; the caller commits, then calls forget() with the created
+    # shows.  returns (created, conflicts):
+    #   created:   [{"index": 0, "id": 812, ...the values}, ...]
+    #   conflicts: [{"index": 3, "missing": [...], "booked": [...], "requested": [...]}, ...]
+    found = {side: lock(model, {entry[key.key] for entry in entries}) for side, (model, key) in SIDES.items()}
+    overlaps = booked(entries)
+
+    calendars = {side: defaultdict(Calendar) for side in SIDES}
+    accepted = []
+    conflicts = []
+    for i, entry in enumerate(entries):
+        start, end = entry['start_time'], end_of(entry)
+        conflict = {"index": i}
+        missing = [side for side, (_, key) in SIDES.items() if entry[key.key] not in found[side]]
+        if missing:
+            conflict["missing"] = missing
+        if overlaps.get(i):
+            conflict["booked"] = overlaps[i]
+        requested = [
+            {"side": side, "index": j}
+            for side, (_, key) in SIDES.items()
+            for j in calendars[side][entry[key.key]].overlapping(start, end)
+        ]
+        if requested:
+            conflict["requested"] = requested
+        if len(conflict) > 1:
+            conflicts.append(conflict)
+            continue
+        for side, (_, key) in SIDES.items():
+            calendars[side][entry[key.key]].add(start, end, i)
+        accepted.append(i)
+
+    created = []
+    if accepted:
+        rows = [dict(entries[i]) for i in accepted]
+        #the venues and artists count the new shows in the same transaction
+        counters.count_shows(rows, now)
+        #postgres returns the ids of a multi-row VALUES insert in row order
+        ids = db.session.execute(insert(Show).values(rows).returning(Show.id)).scalars().all()
+        created = [dict(entries[i], index=i, id=id) for i, id in zip(accepted, ids)]
+    return created, conflicts
+
+
+def forget(created):
+    #after the commit: the cached pages that list the new shows
+    for side, (_, key) in SIDES.items():
+        ids = {show[key.key] for show in created}
+        if ids:
+            detail_cache.invalidate(side, *ids)
+
+
+#----------------------------------------------------------------------------#
+# Free slots.
+#----------------------------------------------------------------------------#
+
+def availability_args(args):
+    # city, state, window and shortest slot of an availability request;
+    # raises ValueError with the reason.  `from` and `to` are local dates or
+    # times, `to` excluded; the window is capped by AVAILABILITY_MAX_DAYS
+    city, state = args.get('city'), args.get('state')
+    if not city or not state:
+        raise ValueError('city and state are required')
+    try:
+        start = datetime.fromisoformat(args['from'])
+        end = datetime.fromisoformat(args['to'])
+    except (KeyError, ValueError):
+        raise ValueError('from and to must be ISO 8601 dates or times')
+    if start.tzinfo is not None or end.tzinfo is not None:
+        raise ValueError('from and to must be local times, without a UTC offset')
+    if not start < end <= start + timedelta(days=current_app.config['AVAILABILITY_MAX_DAYS']):
+        raise ValueError('to must be after from, by at most {} days'.format(current_app.config['AVAILABILITY_MAX_DAYS']))
+    min_slot = args.get('min_slot', DEFAULT_SHOW_DURATION, type=int)
+    if not 0 < min_slot <= MAX_DURATION:
+        raise ValueError('min_slot must be a number of minutes between 1 and {}'.format(MAX_DURATION))
+    return {"city": city, "state": state, "start": start, "end": end, "min_slot": timedelta(minutes=min_slot)}
+
+
+def free_slots(bookings, start, end, min_slot):
+    # the sweep: `bookings` are the (start, end) periods of one venue sorted
+    # by start, the line moves past each of them and every gap of at least
+    # min_slot it leaves behind in [start, end) is a free slot.  bookings
+    # that began before the window or overlap each other only push it on
+    free_from = start
+    for booked_start, booked_end in bookings:
+        if booked_start - free_from >= min_slot:
+            yield free_from, booked_start
+        free_from = max(free_from, booked_end)
+    if end - free_from >= min_slot:
+        yield free_from, end
+
+
+def availability(city, state, start, end, min_slot):
+    # venues of a city with their free slots in [start, end), venues booked
+    # throughout are left out.  venues without a show in the window come
+    # from the outer join with a single empty row
+    stmt = (
+        select(Venue.id, Venue.name, Show.start_time, func.upper(Show.period).label('end_time'))
+        .outerjoin(Show, and_(Show.venue_id == Venue.id, Show.period.op('&&')(func.tsrange(start, end))))
+        .where(Venue.city == city, Venue.state == state)
+        .order_by(Venue.id, Show.start_time)
+    )
+    venues = []
+    for (id, name), rows in groupby(db.session.execute(stmt), key=lambda row: (row.id, row.name)):
+        bookings = [(row.start_time, row.end_time) for row in rows if row.start_time is not None]
+        slots = [{"start": slot_start, "end": slot_end} for slot_start, slot_end in free_slots(bookings, start, end, min_slot)]
+        if slots:
+            venues.append({"id": id, "name": name, "slots": slots})
+    return venues
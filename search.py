@@ -0,0 +1,71 @@
+#----------------------------------------------------------------------------#
+# Venue and artist search.
+#----------------------------------------------------------------------------#
+
+import re
+
+from sqlalchemy import func, or_, select
+
+from models import db, Venue, Artist
+
+#weight of the city's similarity to the term next to the name's
+CITY_RANK = 0.5
+
+
+#full words of the term, each matched as a prefix so results follow typing
+def _prefix_tsquery(term):
+    words = re.findall(r'\w+', term.lower())
+    return ' & '.join(word + ':*' for word in words)
+
+
+def _escape_like(term):
+    return term.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+
+def search(model, term, limit=50):
+    #ranked search over the search_vector tsvector (name, city, state, genres)
+    #plus trigram matching on the name and the city, all served by GIN indexes.
+    #the total number of matches comes back with the rows via a window count,
+    #so the whole search is a single round trip
+    term = term.strip()
+    total = func.count().over().label('total')
+
+    if not term:
+        stmt = select(model.id, model.name, total).order_by(model.name)
+    else:
+        #substring and fuzzy (typo tolerant) matches on the name and the city;
+        #a city match ranks below a name match as good
+        pattern = '%' + _escape_like(term) + '%'
+        matches = [
+            model.name.ilike(pattern, escape='!'),
+            model.name.op('%')(term),
+            model.city.ilike(pattern, escape='!'),
+            model.city.op('%')(term)
+        ]
+        rank = func.similarity(model.name, term) + CITY_RANK * func.similarity(model.city, term)
+
+        tsquery = _prefix_tsquery(term)
+        if tsquery:
+            tsquery = func.to_tsquery('simple', tsquery)
+            matches.append(model.search_vector.op('@@')(tsquery))
+            rank = rank + func.ts_rank(model.search_vector, tsquery)
+
+        stmt = (
+            select(model.id, model.name, total)
+            .where(or_(*matches))
+            .order_by(rank.desc(), model.name)
+        )
+
+    rows = db.session.execute(stmt.limit(limit)).all()
+    return {
+        "count": rows[0].total if rows else 0,
+        "data": [{"id": row.id, "name": row.name} for row in rows]
+    }
+
+
+def search_venues(term, limit=50):
+    return search(Venue, term, limit)
+
+
+def search_artists(term, limit=50):
+    return search(Artist, term, limit)
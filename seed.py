@@ -0,0 +1,135 @@
+#----------------------------------------------------------------------------#
+# Synthetic data generator (flask seed).
+#----------------------------------------------------------------------------#
+
+import random
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from importer import insert_batch
+from models import GENRE_CHOICES, db, Venue, Artist, Show
+
+#number of shows per scale, venues and artists are derived from it
+SCALES = {
+    '10k': 10000,
+    '100k': 100000,
+    '1m': 1000000,
+}
+
+GENRES = [value for value, _ in GENRE_CHOICES]
+
+CITIES = [
+    ('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('San Diego', 'CA'),
+    ('New York', 'NY'), ('Brooklyn', 'NY'), ('Austin', 'TX'), ('Houston', 'TX'),
+    ('Chicago', 'IL'), ('Seattle', 'WA'), ('Portland', 'OR'), ('Denver', 'CO'),
+    ('Nashville', 'TN'), ('Atlanta', 'GA'), ('Miami', 'FL'), ('Boston', 'MA'),
+    ('Detroit', 'MI'), ('Minneapolis', 'MN'), ('Philadelphia', 'PA'),
+    ('New Orleans', 'LA'), ('Las Vegas', 'NV'),
+]
+
+WORDS = [
+    'Blue', 'Red', 'Golden', 'Silver', 'Velvet', 'Electric', 'Midnight', 'Neon',
+    'Rusty', 'Wild', 'Lonely', 'Crimson', 'Echo', 'Thunder', 'Crystal', 'Paper',
+    'Moon', 'Sun', 'River', 'Garden', 'Tiger', 'Fox', 'Owl', 'Rose', 'Stone',
+    'Hall', 'Room', 'Club', 'Lounge', 'Tavern', 'Theatre', 'Station', 'Palace',
+]
+
+
+def _name(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _genres(rng):
+    return rng.sample(GENRES, rng.randint(1, 3))
+
+
+def venue_rows(rng, count):
+    for i in range(count):
+        city, state = rng.choice(CITIES)
+        yield {
+            "name": 'The {} {}'.format(_name(rng, 2), i),
+            "city": city,
+            "state": state,
+            "address": '{} {} Street'.format(rng.randint(1, 9999), rng.choice(WORDS)),
+            "phone": '{}-{}-{}'.format(rng.randint(200, 999), rng.randint(100, 999), rng.randint(1000, 9999)),
+            "image_link": 'https://picsum.photos/seed/venue{}/400/300'.format(i),
+            "facebook_link": 'https://www.facebook.com/venue{}'.format(i),
+            "website_link": 'https://venue{}.example.com'.format(i),
+            "genres": _genres(rng),
+            "seeking_talent": rng.random() < 0.5,
+            "seeking_description": 'Looking for local acts',
+        }
+
+
+def artist_rows(rng, count):
+    for i in range(count):
+        city, state = rng.choice(CITIES)
+        yield {
+            "name": '{} {}'.format(_name(rng, 2), i),
+            "city": city,
+            "state": state,
+            "phone": '{}-{}-{}'.format(rng.randint(200, 999), rng.randint(100, 999), rng.randint(1000, 9999)),
+            "image_link": 'https://picsum.photos/seed/artist{}/400/300'.format(i),
+            "facebook_link": 'https://www.facebook.com/artist{}'.format(i),
+            "genres": _genres(rng),
+            "seeking_venue": rng.random() < 0.5,
+            "seeking_description": 'Looking for a stage',
+        }
+
+
+def show_rows(rng, count, venue_ids, artist_ids):
+    #two years of shows centred on today, so pages have past and upcoming ones
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=365)
+    for _ in range(count):
+        yield {
+            "venue_id": rng.choice(venue_ids),
+            "artist_id": rng.choice(artist_ids),
+            "start_time": start + timedelta(days=rng.randrange(730), hours=rng.randrange(12)),
+        }
+
+
+def insert_all(model, rows, batch_size, report):
+    batch = []
+    inserted = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            insert_batch(model, batch)
+            inserted += len(batch)
+            batch = []
+            report('{}: {}'.format(model.__tablename__, inserted))
+    if batch:
+        insert_batch(model, batch)
+        inserted += len(batch)
+    report('{}: {} rows'.format(model.__tablename__, inserted))
+
+
+def seed(shows, venues=None, artists=None, batch_size=5000, random_seed=0, report=click.echo):
+    rng = random.Random(random_seed)
+    venues = venues or max(1, shows // 10)
+    artists = artists or max(1, shows // 5)
+
+    insert_all(Venue, venue_rows(rng, venues), batch_size, report)
+    insert_all(Artist, artist_rows(rng, artists), batch_size, report)
+    venue_ids = db.session.execute(select(Venue.id)).scalars().all()
+    artist_ids = db.session.execute(select(Artist.id)).scalars().all()
+    insert_all(Show, show_rows(rng, shows, venue_ids, artist_ids), batch_size, report)
+
+
+@click.command('seed')
+@click.option('--scale', type=click.Choice(sorted(SCALES)), default='10k', show_default=True,
+              help='Number of shows; venues and artists are a tenth and a fifth of it.')
+@click.option('--venues', type=int, help='Override the number of venues.')
+@click.option('--artists', type=int, help='Override the number of artists.')
+@click.option('--batch-size', default=5000, show_default=True)
+@click.option('--random-seed', default=0, show_default=True)
+@with_appcontext
+def seed_command(scale, venues, artists, batch_size, random_seed):
+    """Fill venues, artists and shows with synthetic data."""
+    started = time.perf_counter()
+    seed(SCALES[scale], venues, artists, batch_size, random_seed)
+    click.echo('Done in {:.1f}s'.format(time.perf_counter() - started))
@@ -0,0 +1,80 @@
+#----------------------------------------------------------------------------#
+# Show pages: listing and the create view.
+#----------------------------------------------------------------------------#
+# forms.py (WTForms) is imported inside the form views, so a worker or a
+# CLI command that never handles a form does not load it.
+
+from flask import Blueprint, flash, render_template, request
+
+import queries
+import scheduling
+import templating
+from conditional import conditional
+from instrumentation import query_budget
+from models import DEFAULT_SHOW_DURATION, db
+
+bp = Blueprint('shows', __name__)
+
+
+#--------------------------------------DISPLAYING SHOWS---------------------------------------
+@bp.route('/shows')
+@query_budget(4)
+@conditional(queries.shows_stamps)
+def shows():
+  #Use JOIN queries to merge between shows, artists & venues related to each other,
+  #one page at a time ordered by start time
+  #start times stay datetimes, the template formats each one once
+  #the page is streamed, its rows are read from a server-side cursor as it renders
+  page = queries.shows_stream(**queries.page_args(request.args))
+  return templating.stream_template('pages/shows.html', shows=page.items, page=page)
+
+#-------------------------------CREATE A SHOW------------------------------------
+@bp.route('/shows/create')
+def create_shows():
+  from forms import ShowForm
+  # renders form. do not touch.
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  from forms import ShowForm
+  #the template sends no CSRF token; the field rules are the JSON API's
+  #(scheduling.parse_entry), so a bad duration is reported, not booked
+  form = ShowForm(request.form, meta={'csrf': False})
+  if not form.validate():
+    name, errors = next(iter(form.errors.items()))
+    flash('Show could not be listed: {} - {}'.format(name, errors[0]))
+    return render_template('pages/home.html')
+  try:
+    values = {
+      "artist_id": int(form['artist_id'].data),
+      "venue_id": int(form['venue_id'].data),
+      "start_time": form['start_time'].data,
+      "duration": form['duration'].data or DEFAULT_SHOW_DURATION
+    }
+    #booked like a batch of one: refused if the venue or the artist is taken,
+    #counted and inserted in the same transaction otherwise
+    created, conflicts = scheduling.schedule([values])
+    db.session.commit()
+    scheduling.forget(created)
+    if conflicts:
+      flash(conflict_message(conflicts[0]))
+    else:
+  # on successful db insert, flash success
+      flash('Show was successfully listed!')
+  except:
+    db.session.rollback()
+    flash('An error occured. show could not be listed')
+  finally:
+    db.session.close()
+
+  return render_template('pages/home.html')
+
+def conflict_message(conflict):
+  if conflict.get('missing'):
+    return 'Show could not be listed: no such {}.'.format(' or '.join(conflict['missing']))
+  show = conflict['booked'][0]
+  return 'Show could not be listed: the {} is already booked for show {} at {}.'.format(
+    show['side'], show['show_id'], show['start_time']
+  )
@@ -0,0 +1,107 @@
+#----------------------------------------------------------------------------#
+# Template compilation and fragment caching.
+#----------------------------------------------------------------------------#
+# Compiled templates are kept in a bytecode cache on disk, so a new worker
+# (or a restart) loads them instead of compiling every template again;
+# `flask templates warm` fills it at deploy time.
+#
+# {% cache 'venue-tile', venue.id, venue.updated_at %}...{% endcache %}
+# stores the rendered block under all of its arguments.  With the row
+# version among them a fragment is reused until the row changes, and
+# fragments of old versions are never read again and age out.
+#
+# stream_template() sends a page while it renders: the layout header goes
+# out before the listing's rows have been read.
+
+import os
+
+import click
+from flask import Response, current_app, get_flashed_messages, stream_with_context
+from flask.cli import AppGroup
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+import cache
+
+
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        #backend with get/set (see cache.py), None renders every fragment
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(args)]), [], [], body).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        backend = self.environment.fragment_cache
+        if backend is None:
+            return caller()
+        key = 'fragment:' + repr(tuple(key))
+        value = backend.get(key)
+        if value is None:
+            value = caller()
+            backend.set(key, value)
+        #the block was escaped when it was rendered
+        return Markup(value)
+
+
+#template output pieces joined into one chunk of the streamed response
+STREAM_BUFFER = 5
+
+
+def stream_template(name, **context):
+    # render_template() as a streamed response, evaluated as it is sent and
+    # inside the request context.  flashed messages are taken out of the
+    # session now: it cannot change once the headers are out, and the
+    # layout reads them from the request afterwards
+    app = current_app._get_current_object()
+    get_flashed_messages()
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(name).stream(context)
+    stream.enable_buffering(STREAM_BUFFER)
+    return Response(stream_with_context(stream))
+
+
+templates_cli = AppGroup('templates', help='Template bytecode cache.')
+
+
+def compile_templates(env):
+    #load every template, filling the bytecode cache and the environment's own
+    names = env.list_templates(extensions=['html'])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+@templates_cli.command('warm')
+def warm_command():
+    """Compile every template into the bytecode cache."""
+    click.echo('{} templates compiled'.format(compile_templates(current_app.jinja_env)))
+
+
+def init_app(app):
+    app.config.setdefault('JINJA_BYTECODE_CACHE_DIR', None)
+    app.config.setdefault('FRAGMENT_CACHE', True)
+
+    directory = app.config['JINJA_BYTECODE_CACHE_DIR']
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if app.config['FRAGMENT_CACHE']:
+        app.jinja_env.fragment_cache = cache.make_backend(
+            app.config,
+            ttl=app.config.get('FRAGMENT_CACHE_TTL'),
+            maxsize=app.config.get('FRAGMENT_CACHE_MAXSIZE')
+        )
+    app.cli.add_command(templates_cli)
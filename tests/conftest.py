@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+#the application modules are imported from the repository root, as app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def client():
+    from app import create_app
+    app = create_app()
+    #the in-memory indexes are loaded from the database, which these
+    #requests never reach: every one of them is rejected first
+    app.before_first_request_funcs.clear()
+    return app.test_client()
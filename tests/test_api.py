@@ -0,0 +1,32 @@
+import pytest
+
+
+@pytest.mark.parametrize('body', [[1], 'ids', 3, {"ids": []}, {"ids": [1, "2"]}, {"ids": [True]}, {"id": [1]}])
+def test_batch_delete_rejects_other_bodies(client, body):
+    response = client.delete('/api/v1/venues', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "expected {\"ids\": [integer, ...]}"}
+
+
+def test_batch_delete_rejects_invalid_json(client):
+    response = client.delete('/api/v1/artists', data='{"ids": [1', content_type='application/json')
+    assert response.status_code == 400
+    assert response.is_json
+
+
+@pytest.mark.parametrize('body', [[{"artist_id": 1}], 'shows', {"shows": []}, {"shows": {"artist_id": 1}}, {"show": [{}]}])
+def test_scheduling_rejects_other_bodies(client, body):
+    response = client.post('/api/v1/shows', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "expected {\"shows\": [show, ...]}"}
+
+
+def test_scheduling_reports_every_invalid_show(client):
+    response = client.post('/api/v1/shows', json={"shows": [
+        {"artist_id": 1, "venue_id": 2, "start_time": "2021-09-01T20:00"},
+        {"artist_id": 1, "venue_id": 2, "start_time": "2021-09-01T20:00", "duration": -30},
+        [1, 2],
+    ]})
+    assert response.status_code == 400
+    assert [error["index"] for error in response.get_json()["errors"]] == [1, 2]
+
@@ -0,0 +1,78 @@
+import pytest
+
+from autocomplete import PrefixIndex
+
+NAMES = [
+    (1, 'The Musical Hop'),
+    (2, 'Park Square Live Music & Coffee'),
+    (3, 'The Dueling Pianos Bar'),
+    (4, 'Musical Theatre Company'),
+    (5, 'Guns N Petals'),
+]
+
+
+@pytest.fixture
+def index():
+    return PrefixIndex(lambda: NAMES)
+
+
+def ids(results):
+    return [result["id"] for result in results]
+
+
+def test_prefix_of_any_word(index):
+    assert ids(index.lookup('pian')) == [3]
+    assert index.lookup('petal') == [{"id": 5, "name": 'Guns N Petals'}]
+
+
+def test_names_starting_with_the_query_come_first(index):
+    #then alphabetically, case folded
+    assert ids(index.lookup('mus')) == [4, 2, 1]
+
+
+def test_every_word_must_match(index):
+    assert ids(index.lookup('the mus')) == [1, 4]
+    assert ids(index.lookup('live coffee')) == [2]
+    assert index.lookup('live piano') == []
+
+
+def test_empty_query(index):
+    assert index.lookup('') == []
+    assert index.lookup(' & ') == []
+
+
+def test_limit(index):
+    assert ids(index.lookup('mus', limit=2)) == [4, 2]
+
+
+def test_words_longer_than_the_indexed_prefixes():
+    index = PrefixIndex(lambda: [(1, 'Supercalifragilistic Hall'), (2, 'Supercalifornia Club')], max_prefix=6)
+    assert ids(index.lookup('supercal')) == [2, 1]
+    assert ids(index.lookup('supercalifr')) == [1]
+    assert index.lookup('supercalx') == []
+
+
+def test_add_and_rename(index):
+    index.lookup('warm up the index')
+    index.add(6, 'Jazz Hop Cellar')
+    assert ids(index.lookup('hop')) == [6, 1]
+    index.add(1, 'The Musical Jump')
+    assert ids(index.lookup('hop')) == [6]
+    assert ids(index.lookup('jump')) == [1]
+
+
+def test_removed_ids_are_not_found(index):
+    index.lookup('the')
+    index.remove(3)
+    assert ids(index.lookup('the')) == [1, 4]
+    assert index.lookup('pianos') == []
+    #removing an unknown id is a no-op
+    index.remove(404)
+
+
+def test_changes_before_the_first_load_are_left_to_the_load():
+    names = []
+    index = PrefixIndex(lambda: names)
+    index.add(1, 'Early Bird')
+    names.append((2, 'Early Show'))
+    assert ids(index.lookup('early')) == [2]
@@ -0,0 +1,127 @@
+import pytest
+
+import cache
+from cache import DetailCache, LocalClient, LRUCache, SharedCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, 'monotonic', clock)
+    return clock
+
+
+#------------------------------LRU CACHE--------------------------
+def test_lru_get_and_set():
+    lru = LRUCache()
+    assert lru.get('venue:1') is None
+    lru.set('venue:1', {"name": 'The Musical Hop'})
+    assert lru.get('venue:1') == {"name": 'The Musical Hop'}
+
+
+def test_lru_drops_the_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    #reading 'a' makes 'b' the least recently used
+    assert lru.get('a') == 1
+    lru.set('c', 3)
+    assert lru.get('b') is None
+    assert (lru.get('a'), lru.get('c')) == (1, 3)
+
+
+def test_lru_overwrite_refreshes_the_entry():
+    lru = LRUCache(maxsize=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.set('a', 10)
+    lru.set('c', 3)
+    assert lru.get('b') is None
+    assert lru.get('a') == 10
+
+
+def test_lru_entries_expire(clock):
+    lru = LRUCache(ttl=300)
+    lru.set('a', 1)
+    clock.now += 300
+    assert lru.get('a') == 1
+    clock.now += 1
+    assert lru.get('a') is None
+    assert 'a' not in lru._entries
+
+
+def test_lru_delete_and_clear():
+    lru = LRUCache()
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.delete('a', 'missing')
+    assert lru.get('a') is None and lru.get('b') == 2
+    lru.clear()
+    assert lru.get('b') is None
+
+
+def test_shared_cache_round_trip(clock):
+    shared = SharedCache(LocalClient(), ttl=60)
+    shared.set('venue:1', ('v1', {"id": 1}))
+    assert shared.get('venue:1') == ('v1', {"id": 1})
+    clock.now += 61
+    assert shared.get('venue:1') is None
+
+
+#------------------------------DETAIL CACHE--------------------------
+@pytest.fixture(params=['memory', 'shared'])
+def details(request):
+    return DetailCache(LRUCache() if request.param == 'memory' else SharedCache(LocalClient()))
+
+
+def test_entry_is_returned_for_its_version(details):
+    details.set('venue', 1, {"name": 'Hop'}, version=('v1',))
+    assert details.get('venue', 1, ('v1',)) == {"name": 'Hop'}
+    #another worker's entry built before an edit is not sent under the new version
+    assert details.get('venue', 1, ('v2',)) is None
+    assert details.stats()["hits"] == 1 and details.stats()["misses"] == 1
+
+
+def test_without_a_version_the_cache_is_bypassed(details):
+    details.set('venue', 1, {"name": 'Hop'}, version=('v1',))
+    assert details.get('venue', 1, None) is None
+    built = []
+    value = details.get_or_build('venue', 1, lambda id: built.append(id) or {"name": 'Hop, edited'}, None)
+    assert value == {"name": 'Hop, edited'} and built == [1]
+    #and the versioned entry is left in place
+    assert details.get('venue', 1, ('v1',)) == {"name": 'Hop'}
+
+
+def test_get_or_build_builds_once_per_version(details):
+    built = []
+
+    def build(id):
+        built.append(id)
+        return {"id": id, "build": len(built)}
+
+    assert details.get_or_build('artist', 4, build, ('v1',)) == {"id": 4, "build": 1}
+    assert details.get_or_build('artist', 4, build, ('v1',)) == {"id": 4, "build": 1}
+    assert details.get_or_build('artist', 4, build, ('v2',)) == {"id": 4, "build": 2}
+    assert built == [4, 4]
+
+
+def test_missing_entities_are_not_cached(details):
+    assert details.get_or_build('venue', 404, lambda id: None, ('v1',)) is None
+    assert details.backend.get(details.key('venue', 404)) is None
+
+
+def test_invalidate(details):
+    details.set('venue', 1, {"id": 1}, ('v1',))
+    details.set('venue', 2, {"id": 2}, ('v1',))
+    details.set('artist', 1, {"id": 1}, ('v1',))
+    details.invalidate('venue', 1, 2)
+    assert details.get('venue', 1, ('v1',)) is None and details.get('venue', 2, ('v1',)) is None
+    assert details.get('artist', 1, ('v1',)) == {"id": 1}
@@ -0,0 +1,133 @@
+from types import SimpleNamespace
+
+import pytest
+
+from matching import CITY_WEIGHT, STATE_WEIGHT, MatchIndex, stamped
+
+
+def venue(id, genres, city, state, seeking=True):
+    return SimpleNamespace(id=id, name='Venue {}'.format(id), image_link='', city=city, state=state,
+                           genres=genres, seeking_talent=seeking)
+
+
+def artist(id, genres, city, state, seeking=True):
+    return SimpleNamespace(id=id, name='Artist {}'.format(id), image_link='', city=city, state=state,
+                           genres=genres, seeking_venue=seeking)
+
+
+@pytest.fixture
+def index():
+    venues = [
+        venue(1, ['Jazz'], 'San Francisco', 'CA'),
+        venue(2, ['Punk', 'Rock n Roll'], 'New York', 'NY'),
+    ]
+    artists = [
+        artist(10, ['Jazz'], 'San Francisco', 'CA'),
+        artist(11, ['Jazz'], 'Los Angeles', 'CA'),
+        artist(12, ['Jazz'], 'San Francisco', 'CA', seeking=False),
+        artist(13, ['Folk'], 'Boston', 'MA'),
+        #same score as artist 11
+        artist(9, ['Jazz'], 'San Diego', 'CA'),
+    ]
+    index = MatchIndex(
+        loaders={'venue': lambda: venues, 'artist': lambda: artists},
+        seeking={'venue': 'seeking_talent', 'artist': 'seeking_venue'}
+    )
+    index.load()
+    return index
+
+
+def ids(matches):
+    return [match["id"] for match in matches]
+
+
+def test_best_matches_first(index):
+    matches = index.matches('venue', [1], 10)[0]
+    #artists not seeking a venue and without a shared genre or place are left out
+    assert ids(matches) == [10, 9, 11]
+    assert matches[0]["score"] == pytest.approx(1 + CITY_WEIGHT + STATE_WEIGHT, abs=1e-3)
+    assert matches[1]["score"] == pytest.approx(1 + STATE_WEIGHT, abs=1e-3)
+
+
+def test_equal_scores_are_ordered_by_id(index):
+    assert ids(index.matches('venue', [1], 10)[0])[1:] == [9, 11]
+
+
+def test_limit(index):
+    assert ids(index.matches('venue', [1], 2)[0]) == [10, 9]
+    assert index.matches('venue', [1], 0) == [[]]
+
+
+def test_city_is_matched_with_its_state():
+    venues = [venue(1, [], 'Portland', 'OR')]
+    artists = [artist(10, [], 'Portland', 'ME'), artist(11, [], 'Portland', 'OR')]
+    index = MatchIndex({'venue': lambda: venues, 'artist': lambda: artists},
+                       {'venue': 'seeking_talent', 'artist': 'seeking_venue'})
+    matches = index.matches('venue', [1], 10)[0]
+    assert ids(matches) == [11]
+    assert matches[0]["score"] == pytest.approx(CITY_WEIGHT + STATE_WEIGHT, abs=1e-3)
+
+
+def test_batch_keeps_the_order_of_ids(index):
+    assert [ids(matches) for matches in index.matches('artist', [13, 404, 10], 10)] == [[], [], [1]]
+
+
+def test_removed_ids_are_not_matched(index):
+    index.remove('artist', 10)
+    assert ids(index.matches('venue', [1], 10)[0]) == [9, 11]
+    assert index.matches('artist', [10], 10) == [[]]
+
+
+def test_removed_row_is_reused(index):
+    index.remove('artist', 10)
+    index.update('artist', artist(20, ['Jazz'], 'San Francisco', 'CA'))
+    assert ids(index.matches('venue', [1], 10)[0]) == [20, 9, 11]
+    assert index.matches('venue', [1], 1)[0][0]["name"] == 'Artist 20'
+
+
+def test_update_moves_an_entity(index):
+    index.update('artist', artist(11, ['Punk'], 'New York', 'NY'))
+    assert ids(index.matches('venue', [1], 10)[0]) == [10, 9]
+    assert ids(index.matches('venue', [2], 10)[0]) == [11]
+
+
+def test_arrays_grow_past_their_capacity(index):
+    for id in range(100, 200):
+        index.update('artist', artist(id, ['Jazz'], 'San Francisco', 'CA'))
+    assert ids(index.matches('venue', [1], 3)[0]) == [10, 100, 101]
+
+
+def test_update_before_the_first_load_is_left_to_the_load():
+    artists = []
+    index = MatchIndex({'venue': lambda: [venue(1, ['Jazz'], 'Austin', 'TX')], 'artist': lambda: artists},
+                       {'venue': 'seeking_talent', 'artist': 'seeking_venue'})
+    index.update('artist', artist(10, ['Jazz'], 'Austin', 'TX'))
+    artists.append(artist(11, ['Jazz'], 'Austin', 'TX'))
+    assert ids(index.matches('venue', [1], 10)[0]) == [11]
+
+
+def test_stamped_adds_the_matched_tiles(index):
+    validator = (('venues', 4), None)
+    matches = index.matches('venue', [1], 2)[0]
+    (values, tiles), last_modified = stamped(validator, matches)
+    assert values == ('venues', 4) and last_modified is None
+    assert tiles == (
+        (10, 'Artist 10', '', 'San Francisco', 'CA', ('Jazz',)),
+        (9, 'Artist 9', '', 'San Diego', 'CA', ('Jazz',)),
+    )
+    assert stamped(None, matches) is None
+
+
+def test_stamped_changes_when_a_shown_match_is_edited(index):
+    validator = (('venues', 4), None)
+    before = stamped(validator, index.matches('venue', [1], 2)[0])
+    #same ids and same order, only the tile's name changes
+    renamed = artist(10, ['Jazz'], 'San Francisco', 'CA')
+    renamed.name = 'Artist 10, renamed'
+    index.update('artist', renamed)
+    after = stamped(validator, index.matches('venue', [1], 2)[0])
+    assert [tile[0] for tile in after[0][1]] == [10, 9]
+    assert after != before
+    #an edit of an artist that is not shown leaves it alone
+    index.update('artist', artist(11, ['Jazz', 'Blues'], 'Los Angeles', 'CA'))
+    assert stamped(validator, index.matches('venue', [1], 2)[0]) == after
@@ -0,0 +1,101 @@
+import base64
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from queries import ARTIST_KEYS, SHOW_KEYS, VENUE_KEYS, decode_cursor, encode_cursor, page_of
+
+
+def rows(*ids):
+    #result rows as keyset() returns them, keyed by the artist id column
+    return [SimpleNamespace(id=id, _mapping={ARTIST_KEYS[0]: id}) for id in ids]
+
+
+def cursor_of(page, name):
+    cursor = getattr(page, name)
+    return None if cursor is None else decode_cursor(cursor, ARTIST_KEYS)
+
+
+def page_ids(page):
+    return [row.id for row in page.items]
+
+
+#------------------------------PAGE OF--------------------------
+def test_first_page_with_more_rows():
+    #limit + 1 rows: the extra one only says there is a next page
+    page = page_of(rows(1, 2, 3, 4), ARTIST_KEYS, None, None, 3)
+    assert page_ids(page) == [1, 2, 3]
+    assert cursor_of(page, 'next_cursor') == [3]
+    assert page.prev_cursor is None
+
+
+def test_only_page():
+    page = page_of(rows(1, 2), ARTIST_KEYS, None, None, 3)
+    assert page_ids(page) == [1, 2]
+    assert page.next_cursor is None and page.prev_cursor is None
+
+
+def test_exactly_full_last_page():
+    page = page_of(rows(4, 5, 6), ARTIST_KEYS, [3], None, 3)
+    assert page_ids(page) == [4, 5, 6]
+    assert page.next_cursor is None
+    assert cursor_of(page, 'prev_cursor') == [4]
+
+
+def test_page_after_a_cursor():
+    page = page_of(rows(4, 5, 6, 7), ARTIST_KEYS, [3], None, 3)
+    assert page_ids(page) == [4, 5, 6]
+    assert cursor_of(page, 'next_cursor') == [6]
+    assert cursor_of(page, 'prev_cursor') == [4]
+
+
+def test_page_before_a_cursor():
+    #rows come in descending order and are flipped back
+    page = page_of(rows(6, 5, 4, 3), ARTIST_KEYS, None, [7], 3)
+    assert page_ids(page) == [4, 5, 6]
+    assert cursor_of(page, 'next_cursor') == [6]
+    assert cursor_of(page, 'prev_cursor') == [4]
+
+
+def test_first_page_before_a_cursor():
+    page = page_of(rows(3, 2, 1), ARTIST_KEYS, None, [4], 3)
+    assert page_ids(page) == [1, 2, 3]
+    assert cursor_of(page, 'next_cursor') == [3]
+    assert page.prev_cursor is None
+
+
+def test_empty_page():
+    for after, before in ((None, None), ([9], None), (None, [1])):
+        page = page_of([], ARTIST_KEYS, after, before, 3)
+        assert page.items == [] and page.next_cursor is None and page.prev_cursor is None
+
+
+#------------------------------CURSORS--------------------------
+def forge(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def test_cursor_round_trip():
+    values = [datetime(2021, 8, 6, 20, 30), 812]
+    assert decode_cursor(encode_cursor(values), SHOW_KEYS) == values
+    assert decode_cursor(encode_cursor(['CA', 'San Francisco', 4]), VENUE_KEYS) == ['CA', 'San Francisco', 4]
+
+
+@pytest.mark.parametrize('cursor, keys', [
+    (None, ARTIST_KEYS),
+    ('', ARTIST_KEYS),
+    ('not base64!', ARTIST_KEYS),
+    (forge({"id": 1}), ARTIST_KEYS),
+    (forge([1, 2]), ARTIST_KEYS),
+    (forge(["x"]), ARTIST_KEYS),
+    (forge([True]), ARTIST_KEYS),
+    (forge([1.5]), ARTIST_KEYS),
+    (forge([None]), ARTIST_KEYS),
+    (forge(["yesterday", 1]), SHOW_KEYS),
+    (forge([20210806, 1]), SHOW_KEYS),
+    (forge(["CA", 94103, 4]), VENUE_KEYS),
+])
+def test_malformed_cursor_falls_back_to_the_first_page(cursor, keys):
+    assert decode_cursor(cursor, keys) is None
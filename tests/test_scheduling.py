@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import DEFAULT_SHOW_DURATION
+from scheduling import MAX_DURATION, Calendar, free_slots, parse_entry
+
+
+def at(hour, minute=0):
+    return datetime(2021, 8, 6, hour, minute)
+
+
+#------------------------------CALENDAR--------------------------
+def test_empty_calendar_has_no_overlaps():
+    assert Calendar().overlapping(at(20), at(22)) == []
+
+
+def test_overlapping_periods_are_found():
+    calendar = Calendar()
+    calendar.add(at(20), at(22), 'evening')
+    assert calendar.overlapping(at(21), at(23)) == ['evening']
+    assert calendar.overlapping(at(19), at(21)) == ['evening']
+    assert calendar.overlapping(at(20, 30), at(21)) == ['evening']
+    assert calendar.overlapping(at(18), at(23)) == ['evening']
+
+
+def test_adjacent_periods_do_not_overlap():
+    #periods are half open, one show may start when the previous one ends
+    calendar = Calendar()
+    calendar.add(at(20), at(22), 'evening')
+    assert calendar.overlapping(at(22), at(23)) == []
+    assert calendar.overlapping(at(18), at(20)) == []
+
+
+def test_periods_added_out_of_order_stay_sorted():
+    calendar = Calendar()
+    calendar.add(at(20), at(21), 'late')
+    calendar.add(at(12), at(13), 'noon')
+    calendar.add(at(16), at(17), 'afternoon')
+    assert calendar.starts == [at(12), at(16), at(20)]
+    assert calendar.entries == ['noon', 'afternoon', 'late']
+    assert calendar.overlapping(at(12, 30), at(20, 30)) == ['noon', 'afternoon', 'late']
+    assert calendar.overlapping(at(13), at(16)) == []
+    assert calendar.overlapping(at(13), at(16, 1)) == ['afternoon']
+
+
+#------------------------------PARSE ENTRY--------------------------
+def test_parse_entry():
+    entry = parse_entry({"artist_id": 1, "venue_id": 2, "start_time": "2021-08-06T20:00:00", "duration": 90})
+    assert entry == {"artist_id": 1, "venue_id": 2, "start_time": at(20), "duration": 90}
+
+
+def test_parse_entry_default_duration():
+    entry = parse_entry({"artist_id": 1, "venue_id": 2, "start_time": "2021-08-06T20:00"})
+    assert entry['duration'] == DEFAULT_SHOW_DURATION
+
+
+@pytest.mark.parametrize('item', [
+    [1, 2],
+    {"venue_id": 2, "start_time": "2021-08-06T20:00"},
+    {"artist_id": "1", "venue_id": 2, "start_time": "2021-08-06T20:00"},
+    {"artist_id": True, "venue_id": 2, "start_time": "2021-08-06T20:00"},
+    {"artist_id": 1, "venue_id": 2},
+    {"artist_id": 1, "venue_id": 2, "start_time": "tonight"},
+    {"artist_id": 1, "venue_id": 2, "start_time": datetime(2021, 8, 6, tzinfo=timezone.utc).isoformat()},
+    {"artist_id": 1, "venue_id": 2, "start_time": "2021-08-06T20:00", "duration": 0},
+    {"artist_id": 1, "venue_id": 2, "start_time": "2021-08-06T20:00", "duration": MAX_DURATION + 1},
+    {"artist_id": 1, "venue_id": 2, "start_time": "2021-08-06T20:00", "duration": 90.5},
+])
+def test_parse_entry_rejects(item):
+    with pytest.raises(ValueError):
+        parse_entry(item)
+
+
+def test_parse_entry_longest_duration():
+    entry = parse_entry({"artist_id": 1, "venue_id": 2, "start_time": "2021-08-06T20:00", "duration": MAX_DURATION})
+    assert entry['duration'] == MAX_DURATION
+
+
+#------------------------------FREE SLOTS--------------------------
+def slots(bookings, start=at(12), end=at(23, 59), minutes=60):
+    return list(free_slots(bookings, start, end, timedelta(minutes=minutes)))
+
+
+def test_no_bookings_leave_the_whole_window():
+    assert slots([]) == [(at(12), at(23, 59))]
+
+
+def test_gaps_around_a_booking():
+    assert slots([(at(15), at(17))]) == [(at(12), at(15)), (at(17), at(23, 59))]
+
+
+def test_adjacent_bookings_leave_no_gap():
+    assert slots([(at(14), at(16)), (at(16), at(18))]) == [(at(12), at(14)), (at(18), at(23, 59))]
+
+
+def test_overlapping_bookings_only_push_the_line():
+    #the second booking ends inside the first, the gap starts after the first
+    assert slots([(at(13), at(18)), (at(14), at(15)), (at(19), at(20))]) == [
+        (at(12), at(13)), (at(18), at(19)), (at(20), at(23, 59))
+    ]
+
+
+def test_booking_before_the_window():
+    assert slots([(at(10), at(13))]) == [(at(13), at(23, 59))]
+
+
+def test_booking_past_the_window():
+    assert slots([(at(22), at(23, 59) + timedelta(hours=2))]) == [(at(12), at(22))]
+
+
+def test_gaps_shorter_than_min_slot_are_skipped():
+    bookings = [(at(13), at(15)), (at(15, 59), at(17)), (at(18), at(23))]
+    assert slots(bookings) == [(at(12), at(13)), (at(17), at(18))]
+    #a gap exactly min_slot long is a slot
+    assert slots(bookings, minutes=59) == [(at(12), at(13)), (at(15), at(15, 59)), (at(17), at(18)), (at(23), at(23, 59))]
+
+
+def test_fully_booked_window_has_no_slot():
+    assert slots([(at(11), at(23, 59))]) == []
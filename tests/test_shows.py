@@ -0,0 +1,17 @@
+import pytest
+
+
+#------------------------------SHOW FORM--------------------------
+@pytest.mark.parametrize('duration', ['0', '-30', '10081', 'two hours'])
+def test_show_form_rejects_bad_durations(client, duration):
+    #refused before any query, with the reason flashed on the page
+    response = client.post('/shows/create', data={
+        "artist_id": '1', "venue_id": '2', "start_time": '2021-09-01 20:00:00', "duration": duration
+    })
+    assert response.status_code == 200
+    assert b'Show could not be listed: duration' in response.data
+
+
+def test_show_form_rejects_a_bad_start_time(client):
+    response = client.post('/shows/create', data={"artist_id": '1', "venue_id": '2', "start_time": 'tonight'})
+    assert b'Show could not be listed: start_time' in response.data
@@ -0,0 +1,184 @@
+#----------------------------------------------------------------------------#
+# Venue pages: listing, search, detail and the create/edit/delete views.
+#----------------------------------------------------------------------------#
+# forms.py (WTForms) is imported inside the form views, so a worker or a
+# CLI command that never handles a form does not load it.
+
+from flask import Blueprint, abort, current_app, flash, g, redirect, render_template, request, url_for
+
+import deletes
+import matching
+import queries
+import search
+from autocomplete import venue_index
+from cache import detail_cache
+from conditional import conditional
+from instrumentation import query_budget
+from matching import match_index
+from models import db, Venue
+
+bp = Blueprint('venues', __name__)
+
+
+#------------------------------DISPLAYING VENUES--------------------------
+@bp.route('/venues')
+@query_budget(4)
+@conditional(queries.venues_stamps)
+def venues():
+  #venues grouped by city and state with their upcoming show counts,
+  #read one page at a time, the counts come from the venues counter column
+  #?city=&state= narrows the listing to one area, ?genre= to one genre
+  page = queries.venue_areas(city=request.args.get('city'), state=request.args.get('state'), genre=request.args.get('genre'), **queries.page_args(request.args))
+  return render_template('pages/venues.html', areas=page.items, page=page)
+
+#---------------------------SEARCHING FOR A VENUE-----------------------
+@bp.route('/venues/search', methods=['POST'])
+@query_budget(2)
+def search_venues():
+  #search allows partial string matching and case-insentive,
+  #results are ranked and counted in the same query
+  search_term = request.form.get('search_term', '')
+  response = search.search_venues(search_term, current_app.config['SEARCH_LIMIT'])
+  return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+  
+
+#------------------------DISPLAYING A VENUE'S DATA-----------------------
+def venue_page_stamps(venue_id):
+  #the recommended artists are part of the page too; the cached payload is
+  #versioned on the venue's own stamps, which the API's is keyed on as well
+  stamps = queries.venue_stamps(venue_id)
+  if stamps is not None:
+    g.detail_version = stamps[0]
+  return matching.stamped(stamps, matching.page_matches('venue', venue_id))
+
+@bp.route('/venues/<int:venue_id>')
+@query_budget(4)
+@conditional(venue_page_stamps)
+def show_venue(venue_id):
+  #venue data with its past and upcoming shows, served from the detail cache
+  #cached per version of the page, see cache.DetailCache
+  data = detail_cache.get_or_build('venue', venue_id, queries.venue_detail, version=g.get('detail_version'))
+  if data is None:
+    abort(404)
+  #recommended artists come from the in-memory match index, not the database
+  matches = matching.page_matches('venue', venue_id)
+  return render_template('pages/show_venue.html', venue=data, matches=matches)
+
+#-----------------------------CREATE A VENUE------------------------
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  from forms import VenueForm
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  from forms import VenueForm
+  form = VenueForm(request.form)
+  try:
+    venue = Venue(
+      name=form.name.data,
+      city=form.city.data,
+      state=form.state.data,
+      address=form.address.data,
+      phone=form.phone.data,
+      genres=form.genres.data,
+      image_link=form.image_link.data,
+      facebook_link=form.facebook_link.data,
+      website_link=form.website_link.data,
+      seeking_talent=form.seeking_talent.data,
+      seeking_description=form.seeking_description.data
+    )
+    db.session.add(venue)
+    db.session.commit()
+    venue_index.add(venue.id, venue.name)
+    match_index.update('venue', venue)
+    flash('Venue ' + request.form['name'] + ' was successfully listed!')
+  except:
+    db.session.rollback()
+    flash('An error occurred. Venue '+ request.form['name'] + ' could not be listed')
+  finally:
+    db.session.close()
+ 
+  return render_template('pages/home.html')
+
+#--------------------------DELETING A VENUE------------------
+@bp.route('/venues/<int:venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+  venue = Venue.query.get(venue_id)
+  if venue is None:
+    abort(404)
+  venue_name = venue.name
+  try:
+    #one DELETE statement, the database removes the venue's shows (see deletes.py)
+    deleted, artist_ids = deletes.delete_entities('venue', [venue_id])
+    db.session.commit()
+    deletes.forget('venue', deleted, artist_ids)
+    #On successice deletion, show a message that venue was deleted
+    flash('Venue ' + venue_name + ' was deleted')
+  except:
+    #In case of failures, show a message that an error occured
+    flash(' an error occured and Venue ' + venue_name + ' was not deleted')
+    db.session.rollback()
+  finally:
+    db.session.close()
+
+  return redirect(url_for('main.index'))
+
+#------------------------EDITING & UPDATING VENUE-------------------
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+  from forms import VenueForm
+  form = VenueForm()
+  venue = Venue.query.get(venue_id)
+  venue={
+    "id": venue.id,
+    "name": venue.name,
+    "genres": venue.genres,
+    "address": venue.address,
+    "city": venue.city,
+    "state": venue.state,
+    "phone": venue.phone,
+    "website_link": venue.website_link,
+    "facebook_link": venue.facebook_link,
+    "seeking_talent": venue.seeking_talent,
+    "seeking_description": venue.seeking_description,
+    "image_link": venue.image_link,
+  }
+  return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+#-------------------------EDIT VENUES SUBMISSION FORM-------------------------
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  from forms import VenueForm
+  try:
+    form = VenueForm(request.form)
+    venue = Venue.query.get(venue_id)
+
+    venue.name = form.name.data
+    venue.genres = form.genres.data
+    venue.city = form.city.data
+    venue.state = form.state.data
+    venue.address = form.address.data
+    venue.phone = form.phone.data
+    venue.facebook_link = form.facebook_link.data
+    venue.website_link = form.website_link.data
+    venue.image_link = form.image_link.data
+    venue.seeking_talent = form.seeking_talent.data
+    venue.seeking_description = form.seeking_description.data
+
+    db.session.commit()
+    venue_index.add(venue_id, venue.name)
+    match_index.update('venue', venue)
+    #the venue's name and image also appear on the pages of its artists
+    detail_cache.invalidate('venue', venue_id)
+    detail_cache.invalidate('artist', *queries.venue_artist_ids(venue_id))
+    #Succesice update
+    flash('Venue ' + request.form['name'] + 'has been updated')
+  except:
+    #Failure of updating
+    db.session.rollback()
+    flash('An error occured while trying to update Venue')
+  finally:
+    db.session.close()
+  return redirect(url_for('.show_venue', venue_id=venue_id))